@@ -83,6 +83,24 @@ app.config['GITHUB_TOKEN'] = os.environ.get('GITHUB_TOKEN') or None
 app.config['GITHUB_TARGET_TYPE'] = os.environ.get('GITHUB_TARGET_TYPE') or 'user'
 app.config['GITHUB_TARGET_NAME'] = os.environ.get('GITHUB_TARGET_NAME') or 'nighthawkcoders'
 
+# Product prediction settings
+app.config['PRODUCT_PREDICTION_CACHE_SIZE'] = int(os.environ.get('PRODUCT_PREDICTION_CACHE_SIZE') or 4096)
+app.config['PRODUCT_PREDICTION_CACHE_TTL'] = int(os.environ.get('PRODUCT_PREDICTION_CACHE_TTL') or 300)  # seconds
+# Served predictions are logged in batches of up to this many rows, at least
+# every interval seconds; a batch size of 0 logs each prediction before responding
+app.config['PRODUCT_PREDICTION_LOG_BATCH'] = int(os.environ.get('PRODUCT_PREDICTION_LOG_BATCH') or 500)
+app.config['PRODUCT_PREDICTION_LOG_INTERVAL'] = float(os.environ.get('PRODUCT_PREDICTION_LOG_INTERVAL') or 2.0)  # seconds
+# Fraction of computed /api/predict responses replayed against the shadow model
+app.config['PRODUCT_SHADOW_SAMPLE_RATE'] = float(os.environ.get('PRODUCT_SHADOW_SAMPLE_RATE') or 0.1)
+# Drift monitoring compares the last one to two windows of served products
+app.config['PRODUCT_DRIFT_WINDOW'] = int(os.environ.get('PRODUCT_DRIFT_WINDOW') or 5000)
+app.config['PRODUCT_TRAINING_MAX_UPLOAD'] = int(os.environ.get('PRODUCT_TRAINING_MAX_UPLOAD') or 512 * 1024 * 1024)  # bytes
+
+# Named model serving (/api/models): loaded models are evicted least recently
+# used first beyond the memory limit, and after max idle seconds without use
+app.config['SERVED_MODELS_MEMORY_LIMIT'] = int(os.environ.get('SERVED_MODELS_MEMORY_LIMIT') or 256 * 1024 * 1024)  # bytes
+app.config['SERVED_MODELS_MAX_IDLE'] = float(os.environ.get('SERVED_MODELS_MAX_IDLE') or 900)  # seconds
+
 # KASM settings
 app.config['KASM_SERVER'] = os.environ.get('KASM_SERVER') or 'https://kasm.nighthawkcodingsociety.com'
 app.config['KASM_API_KEY'] = os.environ.get('KASM_API_KEY') or None
@@ -0,0 +1,192 @@
+"""Several named scikit-learn models served side by side in one process."""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from api.product_model import ProductFeatureEncoder
+
+# Columns trained on Python hash() codes, which are salted per process
+HASHED_SUFFIX = '_hash'
+
+
+class HostedModel:
+    """
+    A loaded estimator and the inputs it expects
+
+    Inputs are the estimator's feature_names_in_, or x0, x1, ... when it was
+    fitted without names. A <name>_hash column was trained on salted hash()
+    codes that cannot be reproduced, so it is not an input at all: it is
+    always encoded as ProductFeatureEncoder.UNKNOWN, as legacy product models
+    are, and <name> is listed under ignored_inputs instead.
+
+    Attributes:
+        name (str): Name the model is served under
+        size (int): Approximate memory footprint in bytes
+        loaded_at (float): When the model was loaded (epoch seconds)
+        last_used (float): Last time the model served a request (epoch seconds)
+        predictions (int): Instances scored since the model was loaded
+    """
+
+    def __init__(self, name, estimator, size):
+        self.name = name
+        self.estimator = estimator
+        self.size = size
+        self.loaded_at = self.last_used = time.time()
+        self.predictions = 0
+        n_features = estimator.n_features_in_
+        names = getattr(estimator, 'feature_names_in_', None)
+        self.columns = list(names) if names is not None else [f'x{i}' for i in range(n_features)]
+        self.inputs = [col for col in self.columns if not col.endswith(HASHED_SUFFIX)]
+        self.ignored_inputs = [col[:-len(HASHED_SUFFIX)] for col in self.columns if col.endswith(HASHED_SUFFIX)]
+
+    @property
+    def kind(self):
+        return 'classifier' if hasattr(self.estimator, 'classes_') else 'regressor'
+
+    def _row(self, instance):
+        if isinstance(instance, (list, tuple)):
+            if len(instance) != len(self.inputs):
+                raise ValueError(f'Expected {len(self.inputs)} values, got {len(instance)}')
+            instance = dict(zip(self.inputs, instance))
+        if not isinstance(instance, dict):
+            raise ValueError('Each instance must be an object or a list of values')
+        missing = [name for name in self.inputs if instance.get(name) is None]
+        if missing:
+            raise ValueError(f"Missing fields: {', '.join(missing)}")
+        row = []
+        for col in self.columns:
+            if col.endswith(HASHED_SUFFIX):
+                row.append(ProductFeatureEncoder.UNKNOWN)
+            else:
+                try:
+                    row.append(float(instance[col]))
+                except (TypeError, ValueError):
+                    raise ValueError(f'{col} must be a number')
+        return row
+
+    def predict(self, instances):
+        """Score a list of instances (dicts keyed by input, or lists in input order)"""
+        X = np.array([self._row(instance) for instance in instances], dtype=float)
+        if hasattr(self.estimator, 'feature_names_in_'):
+            X = pd.DataFrame(X, columns=self.columns)
+        self.last_used = time.time()
+        self.predictions += len(instances)
+        if self.kind == 'regressor':
+            return [{'prediction': float(value)} for value in self.estimator.predict(X)]
+        classes = self.estimator.classes_
+        results = []
+        for probabilities in self.estimator.predict_proba(X):
+            results.append({
+                'prediction': classes[int(np.argmax(probabilities))].item(),
+                'probabilities': {str(label): float(p) for label, p in zip(classes, probabilities)}
+            })
+        return results
+
+    def describe(self):
+        return {
+            'name': self.name,
+            'kind': self.kind,
+            'inputs': self.inputs,
+            'ignored_inputs': self.ignored_inputs,
+            'size_bytes': self.size,
+            'predictions': self.predictions,
+            'loaded_at': self.loaded_at,
+            'idle_seconds': round(time.time() - self.last_used, 3)
+        }
+
+
+class ModelHost:
+    """
+    Loads named models on first use and keeps them within a memory budget
+
+    Models are kept in least-recently-used order. When loading one pushes
+    the total past memory_limit, or a model has been idle for longer than
+    max_idle seconds, the least recently used models are evicted and will
+    be loaded again on their next request. A model's size is its artifact's
+    size on disk, a close proxy for the arrays a forest holds in memory.
+    Each model is loaded under its own lock, so a slow first load never
+    blocks requests for models that are already resident.
+
+    Attributes:
+        memory_limit (int): Bytes of models kept loaded at once
+        max_idle (float): Seconds a model may go unused before it is evicted
+        loads (int): Models loaded since start
+        evictions (int): Models evicted since start
+    """
+
+    def __init__(self, paths, memory_limit=256 * 1024 * 1024, max_idle=900):
+        self.paths = dict(paths)
+        self.memory_limit = memory_limit
+        self.max_idle = max_idle
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {name: threading.Lock() for name in self.paths}
+        self.loads = 0
+        self.evictions = 0
+
+    def names(self):
+        return sorted(self.paths)
+
+    def get(self, name):
+        """The loaded model for name, loading it if needed; KeyError for unknown names"""
+        if name not in self.paths:
+            raise KeyError(name)
+        with self._lock:
+            self._evict_idle()
+            model = self._models.get(name)
+            if model is not None:
+                self._models.move_to_end(name)
+                return model
+
+        with self._load_locks[name]:
+            with self._lock:
+                model = self._models.get(name)
+            if model is None:
+                path = self.paths[name]
+                model = HostedModel(name, joblib.load(path), os.path.getsize(path))
+                with self._lock:
+                    self._models[name] = model
+                    self.loads += 1
+                    self._evict_over_limit(keep=name)
+        return model
+
+    def _evict_idle(self):
+        cutoff = time.time() - self.max_idle
+        for name in [name for name, model in self._models.items() if model.last_used < cutoff]:
+            del self._models[name]
+            self.evictions += 1
+
+    def _evict_over_limit(self, keep):
+        while sum(model.size for model in self._models.values()) > self.memory_limit:
+            name = next((name for name in self._models if name != keep), None)
+            if name is None:
+                # A single model larger than the limit is still served on its own
+                return
+            del self._models[name]
+            self.evictions += 1
+
+    def evict(self, name):
+        """Drop a loaded model; returns whether it was loaded"""
+        with self._lock:
+            if self._models.pop(name, None) is None:
+                return False
+            self.evictions += 1
+            return True
+
+    def stats(self):
+        with self._lock:
+            loaded = {name: model.describe() for name, model in self._models.items()}
+        return {
+            'models': self.names(),
+            'loaded': loaded,
+            'memory_used': sum(model['size_bytes'] for model in loaded.values()),
+            'memory_limit': self.memory_limit,
+            'max_idle': self.max_idle,
+            'loads': self.loads,
+            'evictions': self.evictions
+        }
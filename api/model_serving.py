@@ -0,0 +1,87 @@
+from flask import Blueprint, request, jsonify
+from flask_restful import Api, Resource
+from flask_cors import cross_origin
+from __init__ import app
+from api.model_host import ModelHost
+
+model_serving_api = Blueprint('model_serving_api', __name__, url_prefix='/api')
+api = Api(model_serving_api)
+
+# Bundled models served under /api/models/<name>; paths are relative to the
+# working directory, like the legacy product model
+SERVED_MODEL_PATHS = {
+    'cookie_sales': 'cookie_sales_model.pkl',
+    'titanic_cookie': 'titanic_cookie_model.pkl'
+}
+# Most instances scored by one request
+MAX_MODEL_BATCH = 1000
+
+model_host = ModelHost(
+    SERVED_MODEL_PATHS,
+    memory_limit=app.config['SERVED_MODELS_MEMORY_LIMIT'],
+    max_idle=app.config['SERVED_MODELS_MAX_IDLE']
+)
+
+class ModelListAPI(Resource):
+    @cross_origin(origins=["http://127.0.0.1:4887", "https://open-coding-society.github.io"], supports_credentials=True)
+    def get(self):
+        """Served model names, which are loaded and how much memory they use"""
+        return jsonify(model_host.stats())
+
+class ModelAPI(Resource):
+    @cross_origin(origins=["http://127.0.0.1:4887", "https://open-coding-society.github.io"], supports_credentials=True)
+    def get(self, name):
+        """Kind and inputs of a served model (loads it if needed)"""
+        try:
+            return jsonify(model_host.get(name).describe())
+        except KeyError:
+            return {'message': f'Unknown model {name}'}, 404
+        except Exception as e:
+            return {'message': f'Failed to load model {name}: {str(e)}'}, 500
+
+    @cross_origin(origins=["http://127.0.0.1:4887", "https://open-coding-society.github.io"], supports_credentials=True)
+    def delete(self, name):
+        """Unload a model; it is loaded again on its next request"""
+        if name not in SERVED_MODEL_PATHS:
+            return {'message': f'Unknown model {name}'}, 404
+        return jsonify({'name': name, 'evicted': model_host.evict(name)})
+
+class ModelPredictAPI(Resource):
+    @cross_origin(origins=["http://127.0.0.1:4887", "https://open-coding-society.github.io"], supports_credentials=True)
+    def post(self, name):
+        """Score one instance, or a list of them under "instances".
+
+        An instance is an object keyed by the model's inputs (see
+        GET /api/models/<name>) or a list of values in input order.
+        Fields listed under ignored_inputs are accepted but never used.
+        """
+        data = request.get_json(silent=True)
+        if data is None:
+            return {'message': 'Request body must be JSON'}, 400
+        batch = isinstance(data, dict) and 'instances' in data
+        instances = data['instances'] if batch else [data]
+        if not isinstance(instances, list) or not instances:
+            return {'message': 'instances must be a non-empty list'}, 400
+        if len(instances) > MAX_MODEL_BATCH:
+            return {'message': f'At most {MAX_MODEL_BATCH} instances per request'}, 400
+
+        try:
+            model = model_host.get(name)
+        except KeyError:
+            return {'message': f'Unknown model {name}'}, 404
+        except Exception as e:
+            return {'message': f'Failed to load model {name}: {str(e)}'}, 500
+
+        try:
+            results = model.predict(instances)
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        except Exception as e:
+            return {'message': f'Prediction failed: {str(e)}'}, 500
+        if batch:
+            return jsonify({'model': name, 'ignored_inputs': model.ignored_inputs, 'predictions': results})
+        return jsonify({'model': name, 'ignored_inputs': model.ignored_inputs, **results[0]})
+
+api.add_resource(ModelListAPI, '/models')
+api.add_resource(ModelAPI, '/models/<string:name>')
+api.add_resource(ModelPredictAPI, '/models/<string:name>/predict')
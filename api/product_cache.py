@@ -0,0 +1,72 @@
+"""Bounded cache of /api/predict responses."""
+import threading
+
+from cachetools import TTLCache
+
+
+class PredictionCache:
+    """
+    LRU cache with a time-to-live for prediction responses
+
+    Keys combine the model version with the normalised product inputs, so a
+    response is only reused for the model that produced it. The cache is
+    cleared as soon as a lookup arrives for a different model version.
+
+    Attributes:
+        hits (int): Lookups answered from the cache
+        misses (int): Lookups that had to run the model
+    """
+
+    def __init__(self, maxsize=4096, ttl=300):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(data, version):
+        """Normalised cache key for a prediction request"""
+        return (
+            version,
+            str(data['product_type']).strip().lower(),
+            str(data['seasonality']).strip().lower(),
+            float(data['price']),
+            int(data['marketing']),
+            float(data['distribution_channels'])
+        )
+
+    def get(self, key):
+        with self._lock:
+            if key[0] != self._version:
+                # A different model is serving; nothing cached still applies
+                self._cache.clear()
+                self._version = key[0]
+            value = self._cache.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            if key[0] == self._version:
+                self._cache[key] = value
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'model_version': self._version,
+                'size': len(self._cache),
+                'maxsize': self._cache.maxsize,
+                'ttl': self._cache.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None
+            }
@@ -0,0 +1,214 @@
+"""Input drift monitoring for the product sales predictor.
+
+Training builds a profile of its inputs (build_profile): decile bins and
+counts for each numeric feature and value counts for each categorical one.
+The profile is saved in the model header. At serving time DriftMonitor bins
+every scored product against the same edges in fixed memory and compares
+the two distributions with the population stability index (PSI).
+"""
+import bisect
+import threading
+
+import numpy as np
+import pandas as pd
+
+NUMERIC_DRIFT_FEATURES = ['price', 'marketing', 'distribution_channels']
+CATEGORICAL_DRIFT_FEATURES = ['product_category', 'seasonality']
+PROFILE_BINS = 10
+# Categorical values beyond this many per feature share the OTHER bucket
+MAX_PROFILE_VALUES = 50
+OTHER = '__other__'
+# Usual PSI reading: below 0.1 stable, 0.1-0.25 moderate shift, above 0.25 significant
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+PSI_EPSILON = 1e-4
+
+
+def _normalize(value):
+    return str(value).strip().lower()
+
+
+def build_profile(df, bins=PROFILE_BINS):
+    """Training profile of a frame of product rows (features missing from df are skipped)"""
+    profile = {'rows': int(len(df)), 'numeric': {}, 'categorical': {}}
+    for col in NUMERIC_DRIFT_FEATURES:
+        if col not in df:
+            continue
+        values = pd.to_numeric(df[col], errors='coerce').dropna().to_numpy(dtype=float)
+        if not len(values):
+            continue
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1])).tolist()
+        counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+        profile['numeric'][col] = {'edges': edges, 'counts': counts.tolist()}
+    for col in CATEGORICAL_DRIFT_FEATURES:
+        if col not in df:
+            continue
+        counts = df[col].dropna().map(_normalize).value_counts()
+        top, rest = counts.iloc[:MAX_PROFILE_VALUES], counts.iloc[MAX_PROFILE_VALUES:]
+        values = {value: int(count) for value, count in top.items()}
+        if len(rest):
+            values[OTHER] = int(rest.sum())
+        profile['categorical'][col] = values
+    return profile
+
+
+def extend_profile(profile, df):
+    """Add a frame of new rows to an existing profile, keeping its bins"""
+    if not profile:
+        return build_profile(df)
+    extended = {'rows': profile['rows'] + int(len(df)), 'numeric': {}, 'categorical': {}}
+    for col, spec in profile['numeric'].items():
+        counts = np.asarray(spec['counts'])
+        if col in df:
+            values = pd.to_numeric(df[col], errors='coerce').dropna().to_numpy(dtype=float)
+            counts = counts + np.bincount(np.searchsorted(spec['edges'], values, side='right'),
+                                          minlength=len(counts))
+        extended['numeric'][col] = {'edges': spec['edges'], 'counts': counts.tolist()}
+    for col, values in profile['categorical'].items():
+        values = dict(values)
+        if col in df:
+            for value, count in df[col].dropna().map(_normalize).value_counts().items():
+                key = value if value in values or len(values) < MAX_PROFILE_VALUES else OTHER
+                values[key] = values.get(key, 0) + int(count)
+        extended['categorical'][col] = values
+    return extended
+
+
+def psi(expected, actual):
+    """Population stability index between two count vectors over the same bins"""
+    expected = np.asarray(expected, dtype=float)
+    actual = np.asarray(actual, dtype=float)
+    if expected.sum() == 0 or actual.sum() == 0:
+        return None
+    e = np.maximum(expected / expected.sum(), PSI_EPSILON)
+    a = np.maximum(actual / actual.sum(), PSI_EPSILON)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+def drift_level(value):
+    if value is None:
+        return None
+    if value >= PSI_SIGNIFICANT:
+        return 'significant'
+    if value >= PSI_MODERATE:
+        return 'moderate'
+    return 'stable'
+
+
+class DriftMonitor:
+    """
+    Fixed-memory histograms of served inputs, compared with a model's training profile
+
+    Counts live in two generations of at most window observations each; once
+    the current generation is full it replaces the previous one, so the
+    comparison always covers the last window to 2 * window products and
+    memory never grows. Histograms restart when the served model changes.
+    Each worker monitors the traffic it serves, a random sample of the whole.
+
+    Attributes:
+        window (int): Observations per generation
+        min_observations (int): Observations needed before a verdict is given
+    """
+
+    def __init__(self, window=5000, min_observations=200):
+        self.window = window
+        self.min_observations = min_observations
+        self._lock = threading.Lock()
+        self._version = None
+        self._profile = None
+        self._current = None
+        self._previous = None
+
+    def _empty(self):
+        return {
+            'count': 0,
+            'numeric': {col: np.zeros(len(spec['counts']), dtype=np.int64)
+                        for col, spec in self._profile['numeric'].items()},
+            'categorical': {col: dict.fromkeys(values, 0) for col, values in self._profile['categorical'].items()}
+        }
+
+    def _reset(self, model):
+        self._version = model.version
+        self._profile = model.profile
+        self._current = self._empty() if self._profile else None
+        self._previous = None
+
+    def _rotate(self):
+        if self._current['count'] >= self.window:
+            self._previous, self._current = self._current, self._empty()
+
+    def observe(self, model, record):
+        """Count one served product dict (features plus product_category)"""
+        with self._lock:
+            if model.version != self._version:
+                self._reset(model)
+            if self._current is None:
+                return
+            self._rotate()
+            for col, counts in self._current['numeric'].items():
+                try:
+                    value = float(record[col])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                counts[bisect.bisect_right(self._profile['numeric'][col]['edges'], value)] += 1
+            for col, counts in self._current['categorical'].items():
+                if col in record:
+                    value = _normalize(record[col])
+                    key = value if value in counts else OTHER
+                    counts[key] = counts.get(key, 0) + 1
+            self._current['count'] += 1
+
+    def observe_frame(self, model, df):
+        """Count a frame of served products in one vectorized pass per feature"""
+        with self._lock:
+            if model.version != self._version:
+                self._reset(model)
+            if self._current is None or df.empty:
+                return
+            self._rotate()
+            for col, counts in self._current['numeric'].items():
+                if col in df:
+                    values = pd.to_numeric(df[col], errors='coerce').dropna().to_numpy(dtype=float)
+                    counts += np.bincount(np.searchsorted(self._profile['numeric'][col]['edges'], values,
+                                                          side='right'), minlength=len(counts))
+            for col, counts in self._current['categorical'].items():
+                if col in df:
+                    for value, count in df[col].dropna().map(_normalize).value_counts().items():
+                        key = value if value in counts else OTHER
+                        counts[key] = counts.get(key, 0) + int(count)
+            self._current['count'] += len(df)
+
+    def report(self, model):
+        """PSI of each monitored feature and an overall verdict for the served model"""
+        with self._lock:
+            if model is None or not getattr(model, 'profile', None):
+                return {'model_version': model.version if model else None, 'available': False}
+            if model.version != self._version:
+                self._reset(model)
+            generations = [g for g in (self._previous, self._current) if g]
+            observed = sum(g['count'] for g in generations)
+            training_rows = self._profile['rows']
+
+            features = {}
+            for col, spec in self._profile['numeric'].items():
+                actual = sum(g['numeric'][col] for g in generations)
+                features[col] = psi(spec['counts'], actual)
+            for col, expected in self._profile['categorical'].items():
+                keys = sorted(set(expected) | {k for g in generations for k in g['categorical'][col]})
+                actual = [sum(g['categorical'][col].get(k, 0) for g in generations) for k in keys]
+                features[col] = psi([expected.get(k, 0) for k in keys], actual)
+
+        scores = [v for v in features.values() if v is not None]
+        drift_score = max(scores) if scores else None
+        ready = observed >= self.min_observations
+        return {
+            'model_version': model.version,
+            'available': True,
+            'observed': observed,
+            'training_rows': training_rows,
+            'features': {col: {'psi': round(v, 4) if v is not None else None, 'level': drift_level(v)}
+                         for col, v in features.items()},
+            'drift_score': round(drift_score, 4) if drift_score is not None else None,
+            'level': drift_level(drift_score) if ready else None,
+            'retrain_recommended': bool(ready and drift_score is not None and drift_score >= PSI_SIGNIFICANT)
+        }
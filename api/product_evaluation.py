@@ -0,0 +1,163 @@
+"""Cross-validated evaluation of published product models.
+
+Training metrics are computed on the training rows themselves; this module
+estimates generalization instead. A model version's estimator configuration
+is refitted on k folds (or forward-chained time splits) of the stored
+training rows, with the folds fitted in parallel worker processes, and the
+out-of-fold errors are broken down per product category. The report is
+written next to the version in the registry (see ModelRegistry.write_report).
+
+Like api.product_training, this runs outside the web process and stays free
+of Flask imports.
+"""
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.metrics import r2_score
+from sklearn.model_selection import KFold, TimeSeriesSplit
+
+from api.product_model import ProductFeatureEncoder
+from api.product_training import _load_history
+
+EVALUATION_REPORT = 'evaluation'
+EVALUATION_STRATEGIES = ['kfold', 'time']
+
+# Fold inputs, set once per worker process by _init_fold_worker
+_fold_X = None
+_fold_y = None
+
+
+def _init_fold_worker(X, y):
+    global _fold_X, _fold_y
+    _fold_X, _fold_y = X, y
+
+
+def _fit_fold(estimator, train_index, test_index):
+    """Fit one fold in a worker; returns out-of-fold predictions and timings"""
+    start = time.perf_counter()
+    estimator.fit(_fold_X[train_index], _fold_y[train_index])
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_pred = estimator.predict(_fold_X[test_index])
+    predict_seconds = time.perf_counter() - start
+    return y_pred, fit_seconds, predict_seconds
+
+
+def _errors(y_true, y_pred):
+    error = y_pred - y_true
+    return {
+        'count': int(len(error)),
+        'mae': round(float(np.abs(error).mean()), 3),
+        'rmse': round(float(np.sqrt((error ** 2).mean())), 3),
+        'bias': round(float(error.mean()), 3)
+    }
+
+
+def _splits(strategy, folds, n_rows):
+    if strategy == 'time':
+        # Rows are in id (ingestion) order, so each fold tests on later rows
+        return list(TimeSeriesSplit(n_splits=folds).split(np.zeros(n_rows)))
+    return list(KFold(n_splits=folds, shuffle=True, random_state=42).split(np.zeros(n_rows)))
+
+
+def evaluate_product_model(registry, db_url, version, strategy='kfold', folds=5, window=None,
+                           max_workers=None):
+    """Cross-validate a model version's configuration and store the report.
+
+    The newest window stored training rows (all of them by default) are split
+    with strategy 'kfold' (shuffled k-fold) or 'time' (forward-chained splits
+    in ingestion order); each fold refits a clone of the version's estimator
+    in a process pool of up to max_workers processes.
+
+    Returns a dict with the evaluated model version and the report metrics.
+    """
+    if strategy not in EVALUATION_STRATEGIES:
+        raise ValueError(f'Unknown evaluation strategy {strategy}')
+    if folds < 2:
+        raise ValueError('Evaluation needs at least 2 folds')
+
+    model = registry.load(version)
+    started = time.perf_counter()
+    df = _load_history(db_url, window=window, extra_columns=['product_category'])
+    if len(df) < folds * 2:
+        raise ValueError(f'Insufficient data (need {folds * 2}, got {len(df)})')
+    load_seconds = time.perf_counter() - started
+
+    # Vocabularies carry no target information, so one encoder serves every fold
+    X = ProductFeatureEncoder().fit(df).transform(df)
+    y = df['success_score'].clip(0, 100).to_numpy(dtype=float)
+    estimator = clone(model.estimator)
+    if 'n_jobs' in estimator.get_params():
+        # Parallelism comes from the folds; each fit stays on one core
+        estimator.set_params(n_jobs=None)
+    if 'warm_start' in estimator.get_params():
+        estimator.set_params(warm_start=False)
+
+    splits = _splits(strategy, folds, len(df))
+    workers = max(1, min(len(splits), max_workers or os.cpu_count() or 1))
+    y_pred = np.full(len(df), np.nan)
+    fold_reports = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_fold_worker, initargs=(X, y)) as pool:
+        futures = [pool.submit(_fit_fold, estimator, train, test) for train, test in splits]
+        for i, ((train, test), future) in enumerate(zip(splits, futures)):
+            fold_pred, fit_seconds, predict_seconds = future.result()
+            y_pred[test] = fold_pred
+            fold_reports.append({
+                'fold': i,
+                'train_size': int(len(train)),
+                'test_size': int(len(test)),
+                **_errors(y[test], fold_pred),
+                'r2_score': round(float(r2_score(y[test], fold_pred)), 4) if len(test) > 1 else None,
+                'fit_seconds': round(fit_seconds, 3),
+                'predict_seconds': round(predict_seconds, 4)
+            })
+
+    # Time splits never test the first block, so only score rows that were held out
+    tested = ~np.isnan(y_pred)
+    results = pd.DataFrame({
+        'category': df['product_category'].to_numpy()[tested],
+        'y': y[tested],
+        'y_pred': y_pred[tested]
+    })
+    categories = {
+        category: _errors(group['y'].to_numpy(), group['y_pred'].to_numpy())
+        for category, group in results.groupby('category', sort=True)
+    }
+
+    report = {
+        'model_version': version,
+        'evaluated_at': datetime.utcnow().isoformat(),
+        'strategy': strategy,
+        'folds': folds,
+        'samples': int(len(df)),
+        'first_id': int(df['id'].min()),
+        'last_id': int(df['id'].max()),
+        'overall': {
+            **_errors(results['y'].to_numpy(), results['y_pred'].to_numpy()),
+            'r2_score': round(float(r2_score(results['y'], results['y_pred'])), 4)
+        },
+        'fold_results': fold_reports,
+        'categories': categories,
+        'timing': {
+            'workers': workers,
+            'load_seconds': round(load_seconds, 3),
+            'total_seconds': round(time.perf_counter() - started, 3),
+            'fit_seconds': round(sum(f['fit_seconds'] for f in fold_reports), 3)
+        }
+    }
+    registry.write_report(version, EVALUATION_REPORT, report)
+    return {'model_version': version, 'metrics': {
+        'strategy': strategy,
+        'folds': folds,
+        'samples': report['samples'],
+        **report['overall'],
+        'total_seconds': report['timing']['total_seconds']
+    }}
@@ -0,0 +1,210 @@
+"""Flat-array representation and inference engine for trained random forests.
+
+Every tree of the forest is concatenated into one set of contiguous node
+arrays. Saved uncompressed with joblib, the arrays can be loaded with
+mmap_mode='r', so all workers on a node map the same physical pages instead
+of each unpickling its own copy of the forest.
+
+Prediction walks all trees for a block of rows at once, one tree level per
+step, and skips sklearn's input validation and per-tree joblib dispatch. Inputs
+are rounded to float32 and tree outputs summed in tree order exactly as
+RandomForestRegressor.predict does, so results match sklearn bit for bit;
+FlatForest.verify checks that before a flat forest is saved.
+"""
+import joblib
+import numpy as np
+from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+
+TREE_LEAF = -1
+FOREST_ARRAYS = ['feature', 'threshold', 'children', 'missing_left', 'value', 'roots']
+VERIFY_ROWS = 512
+# Rows traversed together; keeps the (rows x trees) working set in cache
+BLOCK_ROWS = 512
+
+
+def is_flattenable(estimator):
+    """Whether an estimator is a forest whose prediction is the mean of its trees"""
+    return isinstance(estimator, (RandomForestRegressor, ExtraTreesRegressor)) \
+        and hasattr(estimator, 'estimators_') and estimator.n_outputs_ == 1
+
+
+class FlatForest:
+    """
+    A regression forest stored as contiguous node arrays
+
+    Node i of the concatenated forest tests X[:, feature[i]] <= threshold[i]
+    and moves to children[2 * i] (left) or children[2 * i + 1] (right), both
+    global node indices. Leaves point to themselves on both sides, so
+    traversal can run a fixed number of steps.
+
+    Attributes:
+        feature (int32[n_nodes]): Feature tested at each node
+        threshold (float64[n_nodes]): Split threshold at each node
+        children (int32[2 * n_nodes]): Interleaved left/right children
+        missing_left (bool[n_nodes]): Whether missing (NaN) values go left
+        value (float64[n_nodes]): Mean target of the samples reaching each node
+        roots (int32[n_trees]): Global index of each tree's root
+        max_depth (int): Depth of the deepest tree
+    """
+
+    def __init__(self, feature, threshold, children, missing_left, value, roots, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def left(self):
+        return self.children[0::2]
+
+    @property
+    def right(self):
+        return self.children[1::2]
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in FOREST_ARRAYS)
+
+    @staticmethod
+    def from_estimator(estimator):
+        """Flatten a fitted RandomForestRegressor or ExtraTreesRegressor"""
+        feature, threshold, left, right, missing_left, value, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for tree in (e.tree_ for e in estimator.estimators_):
+            n = tree.node_count
+            is_leaf = tree.children_left == TREE_LEAF
+            own = np.arange(offset, offset + n)
+
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+            left.append(np.where(is_leaf, own, tree.children_left + offset))
+            right.append(np.where(is_leaf, own, tree.children_right + offset))
+            missing_left.append(tree.missing_go_to_left.astype(bool) & ~is_leaf)
+            value.append(tree.value[:, 0, 0])
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n
+
+        children = np.empty(2 * offset, dtype=np.int32)
+        children[0::2] = np.concatenate(left)
+        children[1::2] = np.concatenate(right)
+
+        return FlatForest(
+            np.concatenate(feature).astype(np.int32),
+            np.concatenate(threshold).astype(np.float64),
+            children,
+            np.concatenate(missing_left),
+            np.concatenate(value).astype(np.float64),
+            np.asarray(roots, dtype=np.int32),
+            max_depth
+        )
+
+    def save(self, path):
+        """Write the node arrays uncompressed so they can be memory-mapped"""
+        arrays = {name: np.ascontiguousarray(getattr(self, name)) for name in FOREST_ARRAYS}
+        joblib.dump({**arrays, 'max_depth': self.max_depth}, path)
+
+    @staticmethod
+    def load(path, mmap_mode='r'):
+        """Load node arrays, memory-mapped read-only by default"""
+        data = joblib.load(path, mmap_mode=mmap_mode)
+        return FlatForest(*(data[name] for name in FOREST_ARRAYS), data['max_depth'])
+
+    def _prepare(self, X):
+        # sklearn trees compare float32 inputs against float64 thresholds
+        return np.asarray(X, dtype=np.float32).astype(np.float64)
+
+    def apply(self, X):
+        """Global index of the leaf each row reaches in each tree, shape (n_rows, n_trees)"""
+        X = self._prepare(X)
+        n_rows, n_features = X.shape
+        has_missing = bool(np.isnan(X).any())
+        leaves = np.empty((n_rows, self.n_trees), dtype=np.int32)
+
+        for start in range(0, n_rows, BLOCK_ROWS):
+            block = X[start:start + BLOCK_ROWS]
+            flat_X = block.ravel()
+            row_offsets = (np.arange(len(block)) * n_features)[:, None]
+            nodes = np.repeat(self.roots[None, :], len(block), axis=0)
+            for _ in range(self.max_depth):
+                x = flat_X.take(row_offsets + self.feature.take(nodes))
+                go_right = x > self.threshold.take(nodes)
+                if has_missing:
+                    go_right |= np.isnan(x) & ~self.missing_left.take(nodes)
+                nodes = self.children.take(2 * nodes + go_right)
+            leaves[start:start + BLOCK_ROWS] = nodes
+        return leaves
+
+    def predict(self, X):
+        """Mean of the leaf values over all trees, summed in tree order like sklearn"""
+        leaf_values = self.value.take(self.apply(X))
+        return np.cumsum(leaf_values, axis=1)[:, -1] / self.n_trees
+
+    def contributions(self, X):
+        """Per-feature contributions of each row's prediction (Saabas attribution).
+
+        Every split on a row's path moves the prediction from the parent's
+        mean to the child's; that change is credited to the split feature.
+        Returns the bias (mean root value, the same for every row) and an
+        (n_rows, n_features) array, averaged over the trees, such that bias
+        plus a row's contributions equals its prediction up to rounding.
+        """
+        X = self._prepare(X)
+        n_rows, n_features = X.shape
+        has_missing = bool(np.isnan(X).any())
+        contributions = np.zeros((n_rows, n_features))
+
+        for start in range(0, n_rows, BLOCK_ROWS):
+            block = X[start:start + BLOCK_ROWS]
+            flat_X = block.ravel()
+            row_offsets = (np.arange(len(block)) * n_features)[:, None]
+            nodes = np.repeat(self.roots[None, :], len(block), axis=0)
+            totals = np.zeros(len(block) * n_features)
+            for _ in range(self.max_depth):
+                feature = self.feature.take(nodes)
+                x = flat_X.take(row_offsets + feature)
+                go_right = x > self.threshold.take(nodes)
+                if has_missing:
+                    go_right |= np.isnan(x) & ~self.missing_left.take(nodes)
+                children = self.children.take(2 * nodes + go_right)
+                # Leaves point to themselves, so finished paths add nothing
+                delta = self.value.take(children) - self.value.take(nodes)
+                totals += np.bincount((row_offsets + feature).ravel(), weights=delta.ravel(),
+                                      minlength=len(totals))
+                nodes = children
+            contributions[start:start + BLOCK_ROWS] = totals.reshape(len(block), n_features)
+
+        return float(self.value.take(self.roots).mean()), contributions / self.n_trees
+
+    def probe_rows(self, n_features, n_rows=VERIFY_ROWS, seed=0):
+        """Inputs sitting on and around the forest's split thresholds"""
+        rng = np.random.default_rng(seed)
+        X = np.empty((n_rows, n_features))
+        internal = self.left != np.arange(len(self.feature))
+        for col in range(n_features):
+            splits = np.asarray(self.threshold[internal & (self.feature == col)], dtype=np.float32)
+            candidates = np.concatenate([
+                splits,
+                np.nextafter(splits, np.float32(np.inf)),
+                np.nextafter(splits, np.float32(-np.inf))
+            ])
+            candidates = candidates[np.isfinite(candidates)]
+            if not len(candidates):
+                X[:, col] = rng.normal(size=n_rows)
+                continue
+            X[:, col] = rng.choice(candidates, size=n_rows)
+        return X
+
+    def verify(self, estimator, X=None):
+        """Whether predictions match estimator.predict exactly on probe inputs"""
+        if X is None:
+            X = self.probe_rows(estimator.n_features_in_)
+        return bool(np.array_equal(self.predict(X), estimator.predict(X)))
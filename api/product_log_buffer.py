@@ -0,0 +1,159 @@
+"""Write-behind buffer for rows that do not need to be stored before responding."""
+import atexit
+import json
+import os
+import threading
+import time
+
+
+class WriteBehindBuffer:
+    """
+    Accumulates rows in memory and writes them in batches on a background thread
+
+    A batch is written once max_size rows are pending or the oldest pending
+    row is max_delay seconds old, whichever comes first. A failed write puts
+    its rows back and the next attempt waits max_delay seconds; at most
+    max_pending rows are kept, the oldest being dropped beyond that.
+
+    close() (also registered with atexit) writes whatever is pending. If that
+    last write fails, the rows are appended to spill_path as JSON lines and
+    put back into the buffer the next time one is created with that path.
+
+    Attributes:
+        flushed (int): Rows written so far
+        dropped (int): Rows discarded because too many were pending
+        failures (int): Failed batch writes
+    """
+
+    def __init__(self, write, max_size=500, max_delay=2.0, max_pending=None, spill_path=None):
+        self._write = write
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.max_pending = max_pending or max_size * 20
+        self.spill_path = spill_path
+        self._rows = []
+        self._oldest = None
+        self._retry_at = 0.0
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._closed = False
+        self.flushed = 0
+        self.dropped = 0
+        self.failures = 0
+        self._replay_spill()
+        atexit.register(self.close)
+
+    def add(self, row):
+        """Queue a row; never blocks on the database"""
+        with self._cond:
+            self._ensure_thread()
+            if not self._rows:
+                self._oldest = time.monotonic()
+            self._rows.append(row)
+            if len(self._rows) >= self.max_size:
+                self._cond.notify()
+
+    def _ensure_thread(self):
+        # Started lazily, and again in a forked worker, which inherits no threads
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _due(self):
+        if self._closed:
+            return True
+        now = time.monotonic()
+        if now < self._retry_at:
+            return False
+        return len(self._rows) >= self.max_size or \
+            (self._rows and now - self._oldest >= self.max_delay)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(self._due, timeout=self.max_delay)
+                if self._closed:
+                    return
+            if self._rows:
+                self.flush()
+
+    def _take(self):
+        with self._cond:
+            rows, self._rows, self._oldest = self._rows, [], None
+            return rows
+
+    def _put_back(self, rows):
+        with self._cond:
+            self._rows = rows + self._rows
+            excess = len(self._rows) - self.max_pending
+            if excess > 0:
+                del self._rows[:excess]
+                self.dropped += excess
+            if self._rows:
+                self._oldest = time.monotonic()
+
+    def flush(self):
+        """Write every pending row now; returns False if the write failed"""
+        with self._flush_lock:
+            rows = self._take()
+            if not rows:
+                return True
+            try:
+                self._write(rows)
+                self.flushed += len(rows)
+                return True
+            except Exception as e:
+                self.failures += 1
+                self._retry_at = time.monotonic() + self.max_delay
+                print(f"Failed to write {len(rows)} buffered rows: {e}")
+                self._put_back(rows)
+                return False
+
+    def close(self):
+        """Stop the background thread and write the remaining rows"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=self.max_delay + 5)
+        if not self.flush() and self.spill_path:
+            self._spill(self._take())
+
+    def _spill(self, rows):
+        with open(self.spill_path, 'a') as f:
+            for row in rows:
+                f.write(json.dumps(row, default=str) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _replay_spill(self):
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return
+        # Claim the file first so concurrent workers replay each row once
+        claimed = f"{self.spill_path}.{os.getpid()}.replay"
+        try:
+            os.rename(self.spill_path, claimed)
+        except FileNotFoundError:
+            return
+        with open(claimed) as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        os.remove(claimed)
+        self._put_back(rows)
+        with self._cond:
+            self._ensure_thread()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'pending': len(self._rows),
+                'flushed': self.flushed,
+                'dropped': self.dropped,
+                'failures': self.failures,
+                'max_size': self.max_size,
+                'max_delay': self.max_delay
+            }
@@ -0,0 +1,289 @@
+"""Model artifacts and feature encoding for the product sales predictor.
+
+Kept free of Flask and database imports so training code running outside the
+web process can build and save models with the same encoding the API uses.
+"""
+import os
+import uuid
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from api.product_forest import FlatForest, is_flattenable
+
+# Column order of the model input matrix
+FEATURE_COLUMNS = ['product_type', 'seasonality', 'price', 'marketing', 'distribution_channels']
+CATEGORICAL_COLUMNS = ['product_type', 'seasonality']
+NUMERIC_COLUMNS = ['price', 'marketing', 'distribution_channels']
+
+# Files of a saved model directory
+HEADER_FILE = 'model.joblib'
+ESTIMATOR_FILE = 'estimator.joblib'
+FOREST_FILE = 'forest.joblib'
+
+
+def new_model_version():
+    """Generate a sortable, unique model version string"""
+    return f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+def prepare_product_frame(products, with_score=False):
+    """Validate a list (or frame) of product candidates in one vectorized pass.
+
+    Returns the cleaned frame of valid rows (indexed by their position in the
+    input) and the positions of the rows that were rejected. With
+    with_score, a numeric success_score is required and kept as well.
+    """
+    numeric_fields = NUMERIC_COLUMNS + (['success_score'] if with_score else [])
+    df = pd.DataFrame(products, columns=FEATURE_COLUMNS + numeric_fields[len(NUMERIC_COLUMNS):])
+    numeric = df[numeric_fields].apply(pd.to_numeric, errors='coerce')
+    valid = (
+        numeric.notna().all(axis=1)
+        & df['product_type'].map(lambda v: isinstance(v, str))
+        & df['seasonality'].map(lambda v: isinstance(v, str))
+    )
+
+    clean = df.loc[valid, CATEGORICAL_COLUMNS].copy()
+    clean['price'] = numeric.loc[valid, 'price'].astype(float)
+    clean['marketing'] = numeric.loc[valid, 'marketing'].astype(int)
+    clean['distribution_channels'] = numeric.loc[valid, 'distribution_channels'].astype(float)
+    if with_score:
+        clean['success_score'] = numeric.loc[valid, 'success_score'].astype(float)
+    return clean, df.index[~valid].tolist()
+
+
+class ProductFeatureEncoder:
+    """
+    Deterministic ordinal encoder for the categorical product features
+
+    Each categorical column gets a vocabulary learned at fit time; values are
+    normalised (trimmed, lower-cased) and mapped to their vocabulary index,
+    with unseen values encoded as UNKNOWN. Unlike hash(), the codes are the
+    same in every process, and the vocabulary is saved with the model.
+    """
+    UNKNOWN = -1
+
+    def __init__(self, vocabularies=None):
+        self.vocabularies = {col: list((vocabularies or {}).get(col, [])) for col in CATEGORICAL_COLUMNS}
+        self._index = {}
+
+    @staticmethod
+    def _normalize(values):
+        return pd.Series(values, dtype=object).astype(str).str.strip().str.lower()
+
+    def fit(self, df):
+        """Learn the vocabularies from a frame of product rows"""
+        for col in CATEGORICAL_COLUMNS:
+            self.vocabularies[col] = sorted(self._normalize(df[col]).unique().tolist())
+        self._index = {}
+        return self
+
+    def extend(self, df):
+        """Append unseen values to the vocabularies, keeping existing codes stable"""
+        for col in CATEGORICAL_COLUMNS:
+            known = set(self.vocabularies[col])
+            for value in self._normalize(df[col]).unique().tolist():
+                if value not in known:
+                    self.vocabularies[col].append(value)
+                    known.add(value)
+        self._index = {}
+        return self
+
+    def encode_value(self, col, value):
+        """Encode a single categorical value without going through pandas"""
+        if col not in self._index:
+            self._index[col] = {v: i for i, v in enumerate(self.vocabularies[col])}
+        return self._index[col].get(str(value).strip().lower(), self.UNKNOWN)
+
+    def encode(self, col, values):
+        """Encode one categorical column to integer codes"""
+        return pd.Categorical(self._normalize(values), categories=self.vocabularies[col]).codes
+
+    def transform(self, df):
+        """Build the float model input matrix for a frame of product rows"""
+        return np.column_stack([
+            self.encode('product_type', df['product_type']).astype(float),
+            self.encode('seasonality', df['seasonality']).astype(float),
+            df['price'].to_numpy(dtype=float),
+            df['marketing'].to_numpy(dtype=float),
+            df['distribution_channels'].to_numpy(dtype=float)
+        ])
+
+    def to_dict(self):
+        return {'vocabularies': self.vocabularies}
+
+    @staticmethod
+    def from_dict(data):
+        return ProductFeatureEncoder(data.get('vocabularies'))
+
+
+class ProductModel:
+    """
+    A trained estimator together with the encoder and version it was built with
+
+    Saved models are directories: a small header (version, encoder, metadata),
+    the pickled estimator, and for random forests a flat copy of the trees
+    (see FlatForest). Loading maps the flat forest read-only and leaves the
+    estimator on disk until something needs it, so serving workers share one
+    physical copy of the trees and start without unpickling the forest.
+
+    Attributes:
+        estimator: Fitted scikit-learn regressor (loaded on first access)
+        encoder (ProductFeatureEncoder): Encoder used to build the inputs
+        version (str): Model version identifier
+        trained_at (str): ISO timestamp of training, if known
+        metadata (dict): Free-form training details (sample counts, metrics, ...)
+        forest (FlatForest): Memory-mapped flat forest, if the estimator is one
+        importances (dict): Global feature importances, computed once per model
+        profile (dict): Training input distributions for drift monitoring (see api.product_drift)
+    """
+
+    def __init__(self, estimator, encoder, version=None, trained_at=None, metadata=None,
+                 forest=None, estimator_path=None, importances=None, profile=None):
+        self._estimator = estimator
+        self._estimator_path = estimator_path
+        self._importances = importances
+        self.profile = profile
+        self.encoder = encoder
+        self.version = version or new_model_version()
+        self.trained_at = trained_at
+        self.metadata = metadata or {}
+        self.forest = forest
+
+    @property
+    def estimator(self):
+        if self._estimator is None and self._estimator_path:
+            self._estimator = joblib.load(self._estimator_path)
+        return self._estimator
+
+    @property
+    def importances(self):
+        """Impurity-based importance of each feature, or None if the estimator has none
+
+        Saved in the model header, so serving workers never load the
+        estimator for them; older artifacts compute them once on first use.
+        """
+        if self._importances is None:
+            values = getattr(self.estimator, 'feature_importances_', None)
+            if values is not None and len(values) == len(FEATURE_COLUMNS):
+                self._importances = {col: round(float(v), 6) for col, v in zip(FEATURE_COLUMNS, values)}
+        return self._importances
+
+    def features(self, df):
+        """Encode a frame of product rows into the model input matrix"""
+        return self.encoder.transform(df)
+
+    def predict_features(self, X):
+        """Predict raw success scores for an encoded input matrix"""
+        if self.forest is not None:
+            return self.forest.predict(X)
+        return self.estimator.predict(X)
+
+    def predict(self, df):
+        """Predict raw success scores for a frame of product rows"""
+        return self.predict_features(self.features(df))
+
+    def _record_features(self, record):
+        return np.array([[
+            self.encoder.encode_value('product_type', record['product_type']),
+            self.encoder.encode_value('seasonality', record['seasonality']),
+            float(record['price']),
+            int(record['marketing']),
+            float(record['distribution_channels'])
+        ]], dtype=float)
+
+    def predict_one(self, record):
+        """Predict the raw success score of a single product dict"""
+        return float(self.predict_features(self._record_features(record))[0])
+
+    def explain_one(self, record):
+        """Per-feature contributions to a single product's raw score.
+
+        Only available when the model has a flat forest; returns None
+        otherwise. The bias is the forest's mean training score, and bias
+        plus the contributions gives the raw score.
+        """
+        if self.forest is None:
+            return None
+        bias, contributions = self.forest.contributions(self._record_features(record))
+        return {
+            'bias': round(bias, 4),
+            'contributions': {col: round(float(v), 4) for col, v in zip(FEATURE_COLUMNS, contributions[0])}
+        }
+
+    def predict_grid(self, record, axes):
+        """Predict raw scores for a product over a grid of numeric feature values.
+
+        axes maps one or more numeric columns to the values to try; the
+        record supplies every other feature. The whole grid is built as one
+        matrix and scored in a single call. Returns an array with one
+        dimension per axis, in the order given.
+        """
+        base = self.features(pd.DataFrame([record], columns=FEATURE_COLUMNS))[0]
+        values = [np.asarray(v, dtype=float) for v in axes.values()]
+        mesh = np.meshgrid(*values, indexing='ij')
+        X = np.tile(base, (mesh[0].size, 1))
+        for col, grid in zip(axes, mesh):
+            X[:, FEATURE_COLUMNS.index(col)] = grid.ravel()
+        return self.predict_features(X).reshape(mesh[0].shape)
+
+    def save(self, directory):
+        """Persist the model as a directory of artifacts"""
+        os.makedirs(directory, exist_ok=True)
+        joblib.dump({
+            'version': self.version,
+            'trained_at': self.trained_at,
+            'encoder': self.encoder.to_dict(),
+            'feature_columns': FEATURE_COLUMNS,
+            'metadata': self.metadata,
+            'importances': self.importances,
+            'profile': self.profile
+        }, os.path.join(directory, HEADER_FILE))
+        joblib.dump(self.estimator, os.path.join(directory, ESTIMATOR_FILE))
+        if is_flattenable(self.estimator):
+            forest = FlatForest.from_estimator(self.estimator)
+            # Only serve the flat forest when it reproduces sklearn exactly
+            if forest.verify(self.estimator):
+                forest.save(os.path.join(directory, FOREST_FILE))
+
+    @staticmethod
+    def load(path):
+        """Load a model directory written by save(), or a single-file artifact
+
+        Single-file artifacts are either a header with the estimator inline,
+        or, from before models were versioned, a bare estimator trained on
+        salted hash codes that cannot be reproduced; the latter is wrapped
+        with an empty encoder so every worker at least computes the same
+        features.
+        """
+        if not os.path.isdir(path):
+            artifact = joblib.load(path)
+            if not isinstance(artifact, dict):
+                return ProductModel(artifact, ProductFeatureEncoder(), version='legacy')
+            header, estimator, forest, estimator_path = artifact, artifact['estimator'], None, None
+        else:
+            header = joblib.load(os.path.join(path, HEADER_FILE))
+            forest_path = os.path.join(path, FOREST_FILE)
+            forest = FlatForest.load(forest_path) if os.path.exists(forest_path) else None
+            estimator_path = os.path.join(path, ESTIMATOR_FILE)
+            if 'estimator' in header:
+                estimator = header['estimator']
+            elif forest is None:
+                # Without a flat forest the estimator is needed straight away
+                estimator = joblib.load(estimator_path)
+            else:
+                estimator = None
+
+        return ProductModel(
+            estimator,
+            ProductFeatureEncoder.from_dict(header.get('encoder', {})),
+            version=header.get('version'),
+            trained_at=header.get('trained_at'),
+            metadata=header.get('metadata'),
+            forest=forest,
+            estimator_path=estimator_path,
+            importances=header.get('importances'),
+            profile=header.get('profile')
+        )
@@ -0,0 +1,224 @@
+"""Versioned on-disk registry for product models, with hot swapping.
+
+Layout under the registry root:
+
+    <root>/<version>/               the ProductModel directory (see ProductModel.save)
+    <root>/<version>/meta.json      version, training time and metadata
+    <root>/<version>/<name>.json    reports written after publishing (e.g. evaluation)
+    <root>/CURRENT                  name of the version being served
+    <root>/CURRENT-<channel>        version served on a named channel (e.g. compact)
+
+Versions are written to a temporary directory and renamed into place, and
+CURRENT is replaced atomically, so readers only ever see complete versions.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+
+from api.product_model import ProductModel, HEADER_FILE
+
+POINTER_FILE = 'CURRENT'
+META_FILE = 'meta.json'
+
+
+class ModelRegistry:
+    """
+    Versioned product model artifacts with an atomic "current" pointer
+
+    Attributes:
+        root (str): Directory holding one sub-directory per version
+        legacy_path (str): Pre-registry artifact served when nothing is published
+        keep (int): Number of versions retained when pruning
+    """
+
+    def __init__(self, root, legacy_path=None, keep=10):
+        self.root = root
+        self.legacy_path = legacy_path
+        self.keep = keep
+
+    @property
+    def pointer_path(self):
+        return self.channel_path()
+
+    def channel_path(self, channel=None):
+        """Pointer file of a serving channel; the default channel is CURRENT"""
+        return os.path.join(self.root, f"{POINTER_FILE}-{channel}" if channel else POINTER_FILE)
+
+    def channels(self):
+        """Named channels with a pointer, besides the default one"""
+        if not os.path.isdir(self.root):
+            return []
+        prefix = f"{POINTER_FILE}-"
+        return sorted(name[len(prefix):] for name in os.listdir(self.root)
+                      if name.startswith(prefix) and not name.endswith('.tmp'))
+
+    def version_dir(self, version):
+        return os.path.join(self.root, version)
+
+    def artifact_path(self, version):
+        return os.path.join(self.version_dir(version), HEADER_FILE)
+
+    def _write_atomic(self, path, text):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def publish(self, model, activate=True):
+        """Write a model as a new version, optionally making it current"""
+        os.makedirs(self.root, exist_ok=True)
+        tmp_dir = os.path.join(self.root, f".{model.version}.tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        model.save(tmp_dir)
+        with open(os.path.join(tmp_dir, META_FILE), 'w') as f:
+            json.dump({
+                'version': model.version,
+                'trained_at': model.trained_at,
+                'metadata': model.metadata
+            }, f, default=str)
+        os.rename(tmp_dir, self.version_dir(model.version))
+
+        if activate:
+            self.activate(model.version)
+        self.prune()
+        return model.version
+
+    def activate(self, version, channel=None):
+        """Point CURRENT (or a named channel) at an existing version"""
+        if not os.path.exists(self.artifact_path(version)):
+            raise ValueError(f'Unknown model version {version}')
+        self._write_atomic(self.channel_path(channel), version)
+
+    def deactivate(self, channel):
+        """Remove a named channel's pointer; its workers stop serving it"""
+        if not channel:
+            raise ValueError('The default channel cannot be deactivated')
+        try:
+            os.remove(self.channel_path(channel))
+        except FileNotFoundError:
+            pass
+
+    def current_version(self, channel=None):
+        """Version named by CURRENT (or a channel), or None if nothing has been published"""
+        try:
+            with open(self.channel_path(channel)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def versions(self):
+        """Published versions, oldest first"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if not name.startswith('.') and os.path.exists(self.artifact_path(name))
+        )
+
+    def read_meta(self, version):
+        with open(os.path.join(self.version_dir(version), META_FILE)) as f:
+            return json.load(f)
+
+    def report_path(self, version, name):
+        return os.path.join(self.version_dir(version), f"{name}.json")
+
+    def write_report(self, version, name, report):
+        """Store a JSON report next to a published version"""
+        if not os.path.exists(self.artifact_path(version)):
+            raise ValueError(f'Unknown model version {version}')
+        self._write_atomic(self.report_path(version, name), json.dumps(report, default=str))
+
+    def read_report(self, version, name):
+        """A stored report, or None if the version has none"""
+        try:
+            with open(self.report_path(version, name)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def load(self, version):
+        return ProductModel.load(self.version_dir(version))
+
+    def load_current(self, channel=None):
+        """Load the current model, falling back to the legacy artifact on the default channel"""
+        version = self.current_version(channel)
+        if version:
+            return self.load(version)
+        if channel is None and self.legacy_path and os.path.exists(self.legacy_path):
+            return ProductModel.load(self.legacy_path)
+        return None
+
+    def prune(self):
+        """Delete the oldest versions beyond keep, never one a channel is serving"""
+        pinned = {self.current_version(channel) for channel in [None, *self.channels()]}
+        versions = self.versions()
+        excess = len(versions) - self.keep
+        for version in [v for v in versions if v not in pinned][:max(0, excess)]:
+            shutil.rmtree(self.version_dir(version), ignore_errors=True)
+
+
+class ServedModel:
+    """
+    The model a worker is serving, swapped in the background when CURRENT moves
+
+    refresh() is cheap enough to call before every request: it stats the
+    pointer file at most once per check_interval, and when the pointer has
+    moved it loads the new version on a background thread. Requests keep
+    using the old model until the new one is fully loaded, then pick it up
+    through a single reference assignment.
+
+    With a channel, the worker follows that channel's pointer instead of
+    CURRENT, and serves nothing until the channel has a version.
+    """
+
+    def __init__(self, registry, check_interval=1.0, channel=None):
+        self.registry = registry
+        self.check_interval = check_interval
+        self.channel = channel
+        self.model = registry.load_current(channel)
+        self._pointer_stamp = self._stamp()
+        self._last_check = time.monotonic()
+        self._loading = threading.Lock()
+
+    @property
+    def current(self):
+        return self.model
+
+    def _stamp(self):
+        try:
+            stat = os.stat(self.registry.channel_path(self.channel))
+            return stat.st_ino, stat.st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def refresh(self, force=False):
+        """Start loading the current version if the pointer has moved"""
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+
+        stamp = self._stamp()
+        if stamp == self._pointer_stamp and not force:
+            return
+        if not self._loading.acquire(blocking=False):
+            return  # a swap is already in progress
+        threading.Thread(target=self._swap, args=(stamp,), daemon=True).start()
+
+    def _swap(self, stamp):
+        try:
+            version = self.registry.current_version(self.channel)
+            if version and (self.model is None or self.model.version != version):
+                self.model = self.registry.load(version)
+            elif version is None and self.channel:
+                self.model = None  # the channel was deactivated
+            self._pointer_stamp = stamp
+        except Exception as e:
+            # Keep serving the old model; the next refresh retries
+            print(f"Failed to load product model: {e}")
+        finally:
+            self._loading.release()
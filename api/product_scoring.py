@@ -0,0 +1,101 @@
+"""Offline scoring of product candidate files, outside the web tier.
+
+The input CSV is read in chunks and the chunks are scored in a pool of
+worker processes. Each worker loads the model once; a flat forest is
+memory-mapped, so all workers share one copy of the trees. Results are
+written in input order to a temporary file that replaces the output only
+once every chunk has been scored.
+"""
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from api.product_model import ProductModel, prepare_product_frame
+from api.product_taxonomy import TaxonomyClassifier
+
+SCORING_CHUNK_SIZE = 50000
+INVALID_ROW = 'Missing or invalid fields'
+
+# Loaded once per worker process by _init_scoring_worker
+_model = None
+_taxonomy = None
+
+
+def _init_scoring_worker(model_path, taxonomy_paths):
+    global _model, _taxonomy
+    _model = ProductModel.load(model_path)
+    _taxonomy = TaxonomyClassifier(taxonomy_paths)
+
+
+def _score_chunk(chunk):
+    """Input columns plus success_score, predicted_success, product_category and error"""
+    df, rejected = prepare_product_frame(chunk)
+    out = chunk.copy()
+    out['success_score'] = np.nan
+    out['predicted_success'] = pd.Series(pd.NA, index=out.index, dtype='boolean')
+    out['product_category'] = None
+    out['error'] = None
+    if not df.empty:
+        scores = np.clip(_model.predict(df), 0, 100)
+        out.loc[df.index, 'success_score'] = np.round(scores, 2)
+        out.loc[df.index, 'predicted_success'] = scores >= 70
+        out.loc[df.index, 'product_category'] = _taxonomy.classify_many(df['product_type']).to_numpy()
+    out.loc[rejected, 'error'] = INVALID_ROW
+    return out
+
+
+def score_csv(input_path, output_path, model_path, taxonomy_paths, chunk_size=SCORING_CHUNK_SIZE,
+              workers=None, progress=None):
+    """Score every row of a product CSV and write the results to output_path.
+
+    At most two chunks per worker are in flight, so memory stays bounded
+    however large the input is. progress, if given, is called with the
+    number of rows written so far after each chunk.
+
+    Returns a summary dict with row counts and timing.
+    """
+    workers = workers or os.cpu_count() or 1
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    start = time.perf_counter()
+    rows = invalid = 0
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_scoring_worker,
+                                 initargs=(model_path, taxonomy_paths)) as pool, \
+                open(tmp_path, 'w', newline='') as out:
+            pending = []
+            header = True
+
+            def write_next():
+                nonlocal header, rows, invalid
+                result = pending.pop(0).result()
+                result.to_csv(out, header=header, index=False)
+                header = False
+                rows += len(result)
+                invalid += int(result['error'].notna().sum())
+                if progress:
+                    progress(rows)
+
+            for chunk in pd.read_csv(input_path, chunksize=chunk_size):
+                pending.append(pool.submit(_score_chunk, chunk))
+                if len(pending) >= 2 * workers:
+                    write_next()
+            while pending:
+                write_next()
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return {
+        'rows': rows,
+        'scored': rows - invalid,
+        'invalid': invalid,
+        'workers': workers,
+        'seconds': round(time.perf_counter() - start, 3)
+    }
@@ -0,0 +1,93 @@
+"""Shadow scoring of served predictions against a candidate model."""
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+
+
+class ShadowScorer:
+    """
+    Replays a sample of served predictions against a candidate model, off the request path
+
+    submit() only decides whether to sample and enqueues; a single daemon
+    thread scores the candidate and hands one result dict per sample to
+    record (e.g. WriteBehindBuffer.add). When the queue is full samples are
+    dropped rather than slowing requests down.
+
+    Attributes:
+        sample_rate (float): Fraction of eligible predictions mirrored
+        submitted (int): Samples enqueued
+        dropped (int): Samples discarded because the queue was full
+        failures (int): Samples the candidate failed to score
+    """
+
+    def __init__(self, candidate, record, sample_rate=0.1, max_queue=1000):
+        self._candidate = candidate
+        self._record = record
+        self.sample_rate = sample_rate
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.dropped = 0
+        self.failures = 0
+
+    @property
+    def candidate(self):
+        """The candidate model, or None when shadowing is off"""
+        return self._candidate()
+
+    def submit(self, record, category, primary_version, primary_score, primary_ms):
+        """Maybe mirror a served prediction; returns whether it was queued"""
+        candidate = self._candidate()
+        if candidate is None or candidate.version == primary_version or random.random() >= self.sample_rate:
+            return False
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((candidate, record, category, primary_version, primary_score, primary_ms,
+                                    datetime.utcnow().isoformat()))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.submitted += 1
+        return True
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            candidate, record, category, primary_version, primary_score, primary_ms, served_at = self._queue.get()
+            try:
+                start = time.perf_counter()
+                candidate_score = candidate.predict_one(record)
+                candidate_ms = (time.perf_counter() - start) * 1000
+                self._record({
+                    'candidate_version': candidate.version,
+                    'primary_version': primary_version,
+                    'product_category': category,
+                    'primary_score': primary_score,
+                    'candidate_score': candidate_score,
+                    'primary_ms': primary_ms,
+                    'candidate_ms': candidate_ms,
+                    'date_created': served_at
+                })
+            except Exception as e:
+                self.failures += 1
+                print(f"Shadow scoring failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def stats(self):
+        return {
+            'sample_rate': self.sample_rate,
+            'queued': self._queue.qsize(),
+            'submitted': self.submitted,
+            'dropped': self.dropped,
+            'failures': self.failures
+        }
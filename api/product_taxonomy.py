@@ -0,0 +1,105 @@
+"""Keyword taxonomy used to assign product categories.
+
+The taxonomy is a JSON file of categories in priority order, each with a list
+of keywords; a product belongs to the first category with a keyword anywhere
+in its product type. All keywords are compiled into one regular expression,
+so classification is a single pass over the lower-cased string.
+"""
+import json
+import os
+import re
+import threading
+import time
+
+import pandas as pd
+
+
+class TaxonomyClassifier:
+    """
+    Classifies product types with a compiled keyword taxonomy
+
+    The first existing file in paths is used, so a taxonomy dropped into the
+    instance folder overrides the bundled default. The file is re-read when
+    its modification time changes (checked at most every check_interval
+    seconds), so keywords can change without a deploy.
+    """
+
+    def __init__(self, paths, check_interval=5.0):
+        self.paths = paths
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._source = None
+        self._last_check = 0.0
+        self.reload()
+
+    def _current_file(self):
+        for path in self.paths:
+            try:
+                return path, os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+        raise FileNotFoundError(f'No taxonomy file found in {self.paths}')
+
+    @staticmethod
+    def compile(taxonomy):
+        """Build the single-pass pattern for a taxonomy dict.
+
+        Each category is a named group and the alternation sits inside a
+        lookahead, so matches may overlap and at every position the highest
+        priority category wins; the overall answer is the best category seen
+        at any position, exactly as testing each category's keywords in turn.
+        """
+        groups = []
+        for i, category in enumerate(taxonomy['categories']):
+            keywords = sorted({k.lower() for k in category['keywords']}, key=len, reverse=True)
+            if keywords:
+                groups.append(f"(?P<c{i}>{'|'.join(re.escape(k) for k in keywords)})")
+        pattern = re.compile(f"(?=(?:{'|'.join(groups)}))") if groups else None
+        names = [category['name'] for category in taxonomy['categories']]
+        return pattern, names, taxonomy.get('default', 'miscellaneous')
+
+    def reload(self):
+        """Recompile from the current taxonomy file"""
+        path, mtime = self._current_file()
+        with open(path) as f:
+            compiled = self.compile(json.load(f))
+        with self._lock:
+            self._pattern, self._names, self.default = compiled
+            self._source = (path, mtime)
+            self._last_check = time.monotonic()
+
+    def _reload_if_changed(self):
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        try:
+            if self._current_file() != self._source:
+                self.reload()
+        except (OSError, ValueError, KeyError) as e:
+            # Keep the last good taxonomy if the file is missing or malformed
+            print(f"Failed to reload product taxonomy: {e}")
+
+    @property
+    def categories(self):
+        return list(self._names)
+
+    def classify(self, product_type):
+        """Category of a single product type"""
+        self._reload_if_changed()
+        pattern, names = self._pattern, self._names
+        best = None
+        if pattern is not None:
+            for match in pattern.finditer(str(product_type).lower()):
+                index = int(match.lastgroup[1:])
+                if best is None or index < best:
+                    best = index
+                    if best == 0:
+                        break
+        return names[best] if best is not None else self.default
+
+    def classify_many(self, product_types):
+        """Categories for a sequence of product types, classifying each distinct value once"""
+        values = pd.Series(product_types)
+        unique = values.unique()
+        return values.map(dict(zip(unique, (self.classify(v) for v in unique))))
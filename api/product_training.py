@@ -0,0 +1,374 @@
+"""Training routines for the product sales predictor.
+
+These functions run inside a separate worker process (see productTrainingAPI),
+so they only depend on numpy, pandas, scikit-learn, SQLAlchemy core and
+api.product_model; importing Flask or the app's models here would drag the
+whole app into the child.
+"""
+import copy
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import Ridge
+from sklearn.metrics import r2_score, mean_absolute_error
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from api.product_drift import build_profile, extend_profile
+from api.product_forest import FlatForest, is_flattenable
+from api.product_model import ProductModel, ProductFeatureEncoder, FEATURE_COLUMNS
+
+# Default forest configuration for the product model
+FOREST_PARAMS = {
+    'n_estimators': 200,
+    'min_samples_leaf': 3,
+    'max_depth': 10,
+    'random_state': 42,
+    'max_features': 0.8
+}
+# Estimator backends: default parameters of each; see make_estimator
+ESTIMATOR_BACKENDS = {
+    'forest': FOREST_PARAMS,
+    'hist_gradient_boosting': {
+        'max_iter': 200,
+        'learning_rate': 0.1,
+        'max_depth': None,
+        'min_samples_leaf': 20,
+        'random_state': 42
+    },
+    'linear': {'alpha': 1.0}
+}
+DEFAULT_BACKEND = 'forest'
+BENCHMARK_REPORT = 'benchmark'
+# Warm-started forests drop their oldest trees beyond this size
+MAX_FOREST_SIZE = 1000
+HISTORY_CHUNK_SIZE = 10000
+# Compaction: smallest tree subset tried, distilled shapes as (n_estimators, max_depth),
+# and the number of single-row predictions timed per candidate
+MIN_SUBSET_TREES = 10
+DISTILL_SHAPES = [(25, 4), (25, 6), (50, 6), (50, 8)]
+LATENCY_SAMPLES = 200
+COMPACT_STRATEGIES = ['subset', 'distill']
+
+
+def _score(estimator, X, y):
+    y_pred = estimator.predict(X)
+    return {
+        'r2_score': round(float(r2_score(y, y_pred)), 4) if len(y) > 1 else None,
+        'mae': round(float(mean_absolute_error(y, y_pred)), 2)
+    }
+
+
+def make_estimator(backend=DEFAULT_BACKEND, params=None, n_jobs=None):
+    """An unfitted estimator for a backend, with params overriding its defaults.
+
+    Every backend takes the encoded matrix from ProductFeatureEncoder. The
+    linear backend one-hot encodes the two categorical codes itself, since
+    ordinal codes mean nothing to a linear model.
+    """
+    if backend not in ESTIMATOR_BACKENDS:
+        raise ValueError(f'Unknown estimator backend {backend}')
+    params = {**ESTIMATOR_BACKENDS[backend], **(params or {})}
+    if backend == 'forest':
+        return RandomForestRegressor(n_jobs=n_jobs, **params)
+    if backend == 'hist_gradient_boosting':
+        return HistGradientBoostingRegressor(**params)
+    return Pipeline([
+        ('features', ColumnTransformer([
+            ('categories', OneHotEncoder(handle_unknown='ignore'), [0, 1]),
+            ('numeric', StandardScaler(), [2, 3, 4])
+        ])),
+        ('ridge', Ridge(**params))
+    ])
+
+
+def read_training_history(db_url, after_id=0, window=None, chunk_size=HISTORY_CHUNK_SIZE, extra_columns=()):
+    """Yield stored training rows from product_sales_predictions in id order.
+
+    Rows are streamed in chunks of chunk_size; window limits the read to the
+    newest window training rows. Only rows ingested through /api/train are
+    read, never the model's own logged predictions. extra_columns are read
+    alongside the features and score (e.g. product_category).
+    """
+    columns = FEATURE_COLUMNS + ['success_score'] + list(extra_columns)
+    table = sa.table('product_sales_predictions', sa.column('id'), sa.column('source'),
+                     *[sa.column(col) for col in columns])
+    is_training = table.c.source == 'training'
+
+    engine = sa.create_engine(db_url)
+    try:
+        with engine.connect() as conn:
+            if window:
+                newest = sa.select(table.c.id).where(is_training).order_by(table.c.id.desc()).limit(window)
+                start = conn.execute(sa.select(sa.func.min(newest.subquery().c.id))).scalar()
+                after_id = max(after_id, (start or 1) - 1)
+
+            query = sa.select(table.c.id, *[table.c[col] for col in columns]) \
+                .where(is_training, table.c.id > after_id).order_by(table.c.id)
+            for chunk in pd.read_sql(query, conn, chunksize=chunk_size):
+                yield chunk.dropna()
+    finally:
+        engine.dispose()
+
+
+def _load_history(db_url, after_id=0, window=None, extra_columns=()):
+    chunks = list(read_training_history(db_url, after_id=after_id, window=window, extra_columns=extra_columns))
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=['id'])
+
+
+def train_product_model(samples, registry, params=None, watermark=None, backend=DEFAULT_BACKEND):
+    """Fit a product model on sample dicts (or a frame) and publish it to registry.
+
+    Samples may carry product_category, which only feeds the drift profile
+    saved with the model. A forest is fitted with n_jobs=-1 to use every core of the training
+    process, then reset to a single job before saving so request-time
+    predictions do not pay for joblib dispatch.
+
+    Returns a dict with the new model version and its training metrics.
+    """
+    df = pd.DataFrame(samples)
+    encoder = ProductFeatureEncoder().fit(df)
+    X = encoder.transform(df)
+    y = df['success_score'].clip(0, 100)  # Ensure scores are between 0-100
+
+    estimator = make_estimator(backend, params, n_jobs=-1)
+    start = time.perf_counter()
+    estimator.fit(X, y)
+    fit_seconds = time.perf_counter() - start
+
+    metrics = {'samples_used': len(df), **_score(estimator, X, y), 'fit_seconds': round(fit_seconds, 3)}
+    if backend == 'forest':
+        estimator.set_params(n_jobs=None)
+
+    model = ProductModel(estimator, encoder, trained_at=datetime.utcnow().isoformat(), profile=build_profile(df),
+                         metadata={'mode': 'full', 'backend': backend,
+                                   'params': {**ESTIMATOR_BACKENDS[backend], **(params or {})},
+                                   'metrics': metrics, 'trained_through_id': watermark})
+    registry.publish(model)
+    return {'model_version': model.version, 'metrics': metrics}
+
+
+def update_product_model(registry, db_url, add_trees=50):
+    """Grow the current forest with trees fitted on newly stored training rows.
+
+    Only rows stored after the model's trained_through_id watermark are read,
+    so the cost scales with the new data rather than the whole history. New
+    categorical values are appended to the encoder so existing trees keep
+    their codes; once the forest exceeds MAX_FOREST_SIZE the oldest trees are
+    dropped.
+    """
+    current = registry.load_current()
+    estimator = current.estimator if current else None
+    if not isinstance(estimator, RandomForestRegressor) or current.version == 'legacy':
+        raise ValueError('Incremental training needs a versioned forest; run a full training first')
+
+    watermark = current.metadata.get('trained_through_id') or 0
+    df = _load_history(db_url, after_id=watermark, extra_columns=['product_category'])
+    if len(df) < 5:
+        raise ValueError(f'Insufficient new data (need 5, got {len(df)})')
+
+    encoder = current.encoder.extend(df)
+    X = encoder.transform(df)
+    y = df['success_score'].clip(0, 100)
+
+    estimator.set_params(warm_start=True, n_jobs=-1,
+                         n_estimators=len(estimator.estimators_) + add_trees)
+    start = time.perf_counter()
+    estimator.fit(X, y)
+    fit_seconds = time.perf_counter() - start
+
+    if len(estimator.estimators_) > MAX_FOREST_SIZE:
+        estimator.estimators_ = estimator.estimators_[-MAX_FOREST_SIZE:]
+    estimator.set_params(n_estimators=len(estimator.estimators_))
+
+    metrics = {'samples_used': len(df), **_score(estimator, X, y), 'fit_seconds': round(fit_seconds, 3),
+               'trees_added': add_trees, 'forest_size': len(estimator.estimators_)}
+    estimator.set_params(warm_start=False, n_jobs=None)
+
+    model = ProductModel(estimator, encoder, trained_at=datetime.utcnow().isoformat(),
+                         profile=extend_profile(current.profile, df),
+                         metadata={'mode': 'incremental', 'params': estimator.get_params(),
+                                   'metrics': metrics, 'parent_version': current.version,
+                                   'trained_through_id': int(df['id'].max())})
+    registry.publish(model)
+    return {'model_version': model.version, 'metrics': metrics}
+
+
+def refit_product_window(registry, db_url, window=50000, params=None, backend=DEFAULT_BACKEND):
+    """Refit the model from scratch on the newest window stored training rows"""
+    df = _load_history(db_url, window=window, extra_columns=['product_category'])
+    if len(df) < 5:
+        raise ValueError(f'Insufficient data (need 5, got {len(df)})')
+
+    return train_product_model(df.drop(columns=['id']), registry, params=params,
+                               watermark=int(df['id'].max()), backend=backend)
+
+
+def _tree_subset(estimator, n_trees):
+    """The forest restricted to its first n_trees trees (trees are i.i.d., so any prefix will do)"""
+    subset = copy.copy(estimator)
+    subset.estimators_ = estimator.estimators_[:n_trees]
+    subset.set_params(n_estimators=n_trees)
+    return subset
+
+
+def _candidate_report(estimator, X, y, reference):
+    """Accuracy, fidelity to the parent, latency and size of a candidate forest"""
+    forest = FlatForest.from_estimator(estimator)
+    y_pred = forest.predict(X)
+    rows = X[np.random.default_rng(0).integers(0, len(X), LATENCY_SAMPLES)]
+    timings = []
+    for row in rows:
+        start = time.perf_counter()
+        forest.predict(row[None, :])
+        timings.append(time.perf_counter() - start)
+    return {
+        'n_estimators': forest.n_trees,
+        'max_depth': forest.max_depth,
+        'nbytes': int(forest.nbytes),
+        'latency_ms': round(float(np.median(timings)) * 1000, 4),
+        **_score(forest, X, y),
+        'fidelity_mae': round(float(np.abs(y_pred - reference).mean()), 3)
+    }
+
+
+def _within(report, budget):
+    return (budget.get('max_trees') is None or report['n_estimators'] <= budget['max_trees']) \
+        and (budget.get('latency_ms') is None or report['latency_ms'] <= budget['latency_ms']) \
+        and (budget.get('max_bytes') is None or report['nbytes'] <= budget['max_bytes'])
+
+
+def compact_product_model(registry, db_url, version, strategy='subset', budget=None, window=20000,
+                          channel='compact'):
+    """Build the most accurate cheaper forest that fits a budget and publish it.
+
+    Candidates are prefixes of the parent forest (strategy 'subset') or
+    smaller forests fitted to the parent's predictions (strategy 'distill').
+    Each is scored on the newest window stored training rows, which the
+    parent was trained on, so fidelity_mae (distance from the parent's
+    predictions) is the fairer guide to what is lost. budget may set
+    max_trees, latency_ms (median single-row latency) and max_bytes.
+
+    The chosen candidate is published and, if it fits the budget, activated
+    on channel. Returns a dict with the new model version and metrics
+    including the whole accuracy/latency trade-off table.
+    """
+    if strategy not in COMPACT_STRATEGIES:
+        raise ValueError(f'Unknown compaction strategy {strategy}')
+    budget = {k: v for k, v in (budget or {}).items() if v is not None}
+    parent = registry.load(version)
+    if not is_flattenable(parent.estimator):
+        raise ValueError('Compaction needs a random forest model')
+
+    df = _load_history(db_url, window=window)
+    if len(df) < 5:
+        raise ValueError(f'Insufficient data (need 5, got {len(df)})')
+    X = parent.features(df)
+    y = df['success_score'].clip(0, 100)
+    reference = parent.predict_features(X)
+
+    start = time.perf_counter()
+    estimators = [parent.estimator]
+    if strategy == 'subset':
+        n_trees = len(parent.estimator.estimators_) // 2
+        while n_trees >= MIN_SUBSET_TREES:
+            estimators.append(_tree_subset(parent.estimator, n_trees))
+            n_trees //= 2
+    else:
+        for n_estimators, max_depth in DISTILL_SHAPES:
+            student = RandomForestRegressor(**{**FOREST_PARAMS, 'n_estimators': n_estimators,
+                                               'max_depth': max_depth, 'n_jobs': -1})
+            student.fit(X, reference)
+            estimators.append(student.set_params(n_jobs=None))
+    if len(estimators) == 1:
+        raise ValueError(f'Forest too small to compact (fewer than {2 * MIN_SUBSET_TREES} trees)')
+
+    reports = [_candidate_report(e, X, y, reference) for e in estimators]
+    fitting = [i for i, report in enumerate(reports) if i > 0 and _within(report, budget)]
+    within_budget = bool(fitting)
+    if fitting:
+        chosen = min(fitting, key=lambda i: (reports[i]['fidelity_mae'], reports[i]['latency_ms']))
+    else:
+        chosen = min(range(1, len(reports)), key=lambda i: reports[i]['latency_ms'])
+    for i, report in enumerate(reports):
+        report['role'] = 'parent' if i == 0 else ('chosen' if i == chosen else 'candidate')
+
+    metrics = {**reports[chosen], 'within_budget': within_budget, 'budget': budget,
+               'compact_seconds': round(time.perf_counter() - start, 3), 'tradeoff': reports}
+    model = ProductModel(estimators[chosen], parent.encoder, trained_at=datetime.utcnow().isoformat(),
+                         profile=parent.profile,
+                         metadata={'mode': 'compact', 'strategy': strategy, 'params': estimators[chosen].get_params(),
+                                   'metrics': metrics, 'parent_version': version,
+                                   'trained_through_id': parent.metadata.get('trained_through_id')})
+    registry.publish(model, activate=False)
+    if within_budget and channel:
+        registry.activate(model.version, channel=channel)
+    return {'model_version': model.version, 'metrics': metrics}
+
+
+def benchmark_backends(db_url, backends=None, window=None, test_fraction=0.2, registry=None):
+    """Time and score each estimator backend on the stored training rows.
+
+    The newest window rows (all by default) are split in ingestion order;
+    every backend is fitted on the older part and scored on the newest
+    test_fraction. Prediction is timed through ProductModel, so forests are
+    timed on their flat form as served. With a registry, the report is
+    written next to the current model version.
+    """
+    backends = backends or list(ESTIMATOR_BACKENDS)
+    df = _load_history(db_url, window=window)
+    if len(df) < 10:
+        raise ValueError(f'Insufficient data (need 10, got {len(df)})')
+    split = int(len(df) * (1 - test_fraction))
+    train, test = df.iloc[:split], df.iloc[split:]
+    encoder = ProductFeatureEncoder().fit(train)
+    X_train, X_test = encoder.transform(train), encoder.transform(test)
+    y_train, y_test = train['success_score'].clip(0, 100), test['success_score'].clip(0, 100)
+    rows = X_test[np.random.default_rng(0).integers(0, len(X_test), LATENCY_SAMPLES)]
+
+    results = []
+    for backend in backends:
+        estimator = make_estimator(backend, n_jobs=-1)
+        start = time.perf_counter()
+        estimator.fit(X_train, y_train)
+        fit_seconds = time.perf_counter() - start
+        if backend == 'forest':
+            estimator.set_params(n_jobs=None)
+        forest = FlatForest.from_estimator(estimator) if is_flattenable(estimator) else None
+        model = ProductModel(estimator, encoder, forest=forest)
+
+        start = time.perf_counter()
+        y_pred = model.predict_features(X_test)
+        predict_seconds = time.perf_counter() - start
+        timings = []
+        for row in rows:
+            start = time.perf_counter()
+            model.predict_features(row[None, :])
+            timings.append(time.perf_counter() - start)
+
+        results.append({
+            'backend': backend,
+            'r2_score': round(float(r2_score(y_test, y_pred)), 4),
+            'mae': round(float(mean_absolute_error(y_test, y_pred)), 3),
+            'fit_seconds': round(fit_seconds, 3),
+            'predict_seconds': round(predict_seconds, 4),
+            'latency_ms': round(float(np.median(timings)) * 1000, 4)
+        })
+
+    report = {
+        'benchmarked_at': datetime.utcnow().isoformat(),
+        'train_rows': len(train),
+        'test_rows': len(test),
+        'last_id': int(df['id'].max()),
+        'results': results
+    }
+    version = registry.current_version() if registry else None
+    if version:
+        report['model_version'] = version
+        registry.write_report(version, BENCHMARK_REPORT, report)
+    return report
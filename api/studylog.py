@@ -1,14 +1,32 @@
 from unicodedata import category
-from flask import Blueprint, request, jsonify
+import base64
+import json
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_restful import Api, Resource
 from flask_cors import CORS, cross_origin
-import joblib
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import r2_score, mean_absolute_error
 import pandas as pd
-from model.studylog import productSalesPrediction, db
-from datetime import datetime
+from __init__ import app
+from model.studylog import (productSalesPrediction, productCategoryStats, productPredictionRollup, productTrainingJob,
+                            productShadowResult, ALL_CATEGORIES, ROLLUP_MAX_BUCKETS, db)
+from api.product_registry import ModelRegistry, ServedModel
+from api.product_cache import PredictionCache
+from api.product_log_buffer import WriteBehindBuffer
+from api.product_shadow import ShadowScorer
+from api.product_drift import DriftMonitor
+from api.product_taxonomy import TaxonomyClassifier
+from api.product_model import prepare_product_frame
+from api.product_training import (train_product_model, update_product_model, refit_product_window,
+                                  compact_product_model, ESTIMATOR_BACKENDS, DEFAULT_BACKEND,
+                                  BENCHMARK_REPORT, COMPACT_STRATEGIES)
+from api.product_evaluation import evaluate_product_model, EVALUATION_REPORT, EVALUATION_STRATEGIES
+from datetime import date, datetime
 
 product_api = Blueprint('product_api', __name__, url_prefix='/api')
 api = Api(product_api)
@@ -30,33 +48,164 @@ PRODUCT_CATEGORIES = {
     'books': {'base_price': 14.99, 'seasonality': 'year-round'}
 }
 
-# Load Model
-try:
-    model = joblib.load("titanic_product_model.pkl")
-except FileNotFoundError:
-    model = None
+# Fields every product candidate must provide for scoring
+FEATURE_FIELDS = ['product_type', 'seasonality', 'price', 'marketing', 'distribution_channels']
+NUMERIC_FIELDS = ['price', 'marketing', 'distribution_channels']
+MAX_BATCH_SIZE = 10000
+# What-if sweeps vary up to two of these features over at most MAX_BATCH_SIZE points
+SWEEP_FIELDS = ['price', 'marketing', 'distribution_channels']
+MAX_SWEEP_AXES = 2
+# Training uploads may also be streamed as CSV or NDJSON and are read in chunks
+STREAM_FORMATS = ['text/csv', 'application/x-ndjson']
+INGEST_CHUNK_SIZE = 5000
+# History pages; NDJSON exports read HISTORY_EXPORT_PAGE rows per query
+HISTORY_PAGE_SIZE = 100
+MAX_HISTORY_PAGE_SIZE = 1000
+HISTORY_EXPORT_PAGE = 1000
+# Rollup series served by /analytics/rollups
+ROLLUP_PERIODS = ['day', 'week']
+MAX_ROLLUP_CATEGORIES = 20
+LEGACY_MODEL_PATH = "titanic_product_model.pkl"
+TRAINING_MODES = ['full', 'incremental', 'window']
+# Requests may ask for the compact model ({"model": "compact"}) on high-traffic paths
+COMPACT_CHANNEL = 'compact'
+# Candidate models get a sample of live traffic replayed against them
+SHADOW_CHANNEL = 'shadow'
+
+# Load Model. Versions live in the instance folder, shared by every worker;
+# each worker maps the same forest arrays and picks up a newly activated
+# version between requests.
+registry = ModelRegistry(os.path.join(app.instance_path, 'models', 'product'), legacy_path=LEGACY_MODEL_PATH)
+served_model = ServedModel(registry)
+served_compact = ServedModel(registry, channel=COMPACT_CHANNEL)
+served_shadow = ServedModel(registry, channel=SHADOW_CHANNEL)
+
+# Identical product configurations are answered from a per-worker cache,
+# one per channel so alternating between models does not flush it
+prediction_cache = PredictionCache(maxsize=app.config['PRODUCT_PREDICTION_CACHE_SIZE'],
+                                   ttl=app.config['PRODUCT_PREDICTION_CACHE_TTL'])
+compact_prediction_cache = PredictionCache(maxsize=app.config['PRODUCT_PREDICTION_CACHE_SIZE'],
+                                           ttl=app.config['PRODUCT_PREDICTION_CACHE_TTL'])
+
+@product_api.before_request
+def refresh_served_model():
+    served_model.refresh()
+    served_compact.refresh()
+    served_shadow.refresh()
+
+def select_model(data):
+    """The model and cache for a request; the compact model is used when asked for and published"""
+    if isinstance(data, dict) and data.get('model') == COMPACT_CHANNEL and served_compact.current:
+        return served_compact.current, compact_prediction_cache
+    return served_model.current, prediction_cache
+
+# Served predictions are written behind the response, in batches
+def _write_prediction_log(rows):
+    with app.app_context():
+        df = pd.DataFrame(rows)
+        df['date_created'] = pd.to_datetime(df['date_created'])
+        try:
+            productSalesPrediction.bulk_insert(df)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+prediction_log = None
+if app.config['PRODUCT_PREDICTION_LOG_BATCH'] > 0:
+    prediction_log = WriteBehindBuffer(
+        _write_prediction_log,
+        max_size=app.config['PRODUCT_PREDICTION_LOG_BATCH'],
+        max_delay=app.config['PRODUCT_PREDICTION_LOG_INTERVAL'],
+        spill_path=os.path.join(app.instance_path, 'prediction_log.ndjson')
+    )
+
+def _write_shadow_results(rows):
+    with app.app_context():
+        for row in rows:
+            row['date_created'] = datetime.fromisoformat(row['date_created'])
+        try:
+            productShadowResult.bulk_insert(rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+shadow_results = WriteBehindBuffer(
+    _write_shadow_results,
+    max_size=max(app.config['PRODUCT_PREDICTION_LOG_BATCH'], 1),
+    max_delay=app.config['PRODUCT_PREDICTION_LOG_INTERVAL'],
+    spill_path=os.path.join(app.instance_path, 'shadow_results.ndjson')
+)
+shadow_scorer = ShadowScorer(lambda: served_shadow.current, shadow_results.add,
+                             sample_rate=app.config['PRODUCT_SHADOW_SAMPLE_RATE'])
+
+# Served inputs are compared with the training profile of the main model
+drift_monitor = DriftMonitor(window=app.config['PRODUCT_DRIFT_WINDOW'])
+
+# Training and evaluation run in a separate process so requests never wait
+# on a fit. One job at a time per worker; each job already uses every core.
+_training_pool = None
+_training_futures = {}
+
+def _get_training_pool():
+    global _training_pool
+    if _training_pool is None:
+        _training_pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+    return _training_pool
+
+def _submit_training_job(job, fn, *args):
+    """Run fn(*args) in the training pool on behalf of a saved job.
+
+    A worker that died (e.g. OOM-killed) breaks the pool for good, so a
+    broken pool is replaced and the submission retried once. If it still
+    cannot be submitted the job is marked failed and the error re-raised.
+    """
+    global _training_pool
+    try:
+        try:
+            future = _get_training_pool().submit(fn, *args)
+        except BrokenProcessPool:
+            app.logger.warning("Training pool is broken; starting a new one")
+            _training_pool = None
+            future = _get_training_pool().submit(fn, *args)
+    except Exception as e:
+        job.update({'status': 'failed', 'error': f'Failed to submit job: {e}', 'date_finished': datetime.utcnow()})
+        raise
+    _training_futures[job.id] = future
+    future.add_done_callback(lambda f, job_id=job.id: _finish_training_job(job_id, f))
+    return future
+
+def _finish_training_job(job_id, future):
+    """Record the outcome of a training job and pick up the new model"""
+    _training_futures.pop(job_id, None)
+    with app.app_context():
+        job = productTrainingJob.query.get(job_id)
+        try:
+            result = future.result()
+            served_model.refresh(force=True)
+            served_compact.refresh(force=True)
+            job.update({
+                'status': 'succeeded',
+                'metrics': result['metrics'],
+                'model_version': result['model_version'],
+                'date_finished': datetime.utcnow()
+            })
+        except Exception as e:
+            app.logger.error(f"Training job {job_id} failed: {e}")
+            job.update({'status': 'failed', 'error': str(e), 'date_finished': datetime.utcnow()})
+
+# Category keywords live in a taxonomy file; one in the instance folder
+# overrides the bundled default and is picked up without a deploy
+taxonomy = TaxonomyClassifier([
+    os.path.join(app.instance_path, 'product_taxonomy.json'),
+    os.path.join(os.path.dirname(__file__), 'product_taxonomy.json')
+])
 
 def determine_category(product_type):
     """General category detection based on product type keywords"""
-    product_type = product_type.lower()
-    
-    if any(x in product_type for x in ['apple', 'banana', 'berry', 'fruit', 'orange', 'grape', 'kiwi']):
-        return 'fruits'
-    elif any(x in product_type for x in ['tomato', 'carrot', 'lettuce', 'vegetable', 'cucumber', 'pepper', 'broccoli']):
-        return 'vegetables'
-    elif any(x in product_type for x in ['phone', 'laptop', 'camera', 'electronic', 'PC', 'tablet', 'gadget', 'headphone', 'speaker', 'TV', 'headset']):
-        return 'electronics'
-    elif any(x in product_type for x in ['shirt', 'pants', 'dress', 'jacket', 'jeans', 'sneakers', 'sweater', 'clothing', 'socks', 'hat', 'scarf', 'gloves']):
-        return 'clothing'
-    elif any(x in product_type for x in ['ball', 'racket', 'bat', 'sport', 'exercise', 'fitness', 'gear', 'equipment']):
-        return 'sports'
-    elif any(x in product_type for x in ['furniture', 'decor', 'kitchen', 'home', 'decoration', 'lamp', 'appliance', 'utensil']):
-        return 'home_goods'
-    elif any(x in product_type for x in ['toy', 'game', 'doll', 'lego', 'action figure', 'puzzle', 'board game', 'stuffed animal']):
-        return 'toys'
-    elif any(x in product_type for x in ['book', 'novel', 'textbook', 'magazine', 'comic', 'literature', 'story', 'guide']):
-        return 'books'
-    return 'miscellaneous'  # Default category
+    return taxonomy.classify(product_type)
+
 class productPredictionAPI(Resource):
     @cross_origin(origins=["http://127.0.0.1:4887", "https://open-coding-society.github.io"], supports_credentials=True)
     def post(self):
@@ -68,29 +217,33 @@ class productPredictionAPI(Resource):
         if missing := [f for f in required_fields if f not in data]:
             return {'message': 'Missing required fields', 'missing': missing}, 400
 
+        model, cache = select_model(data)
         if not model:
             return {'message': 'Model not trained. Train first with /api/train'}, 503
 
         try:
-            # Prepare input
-            input_data = np.array([[
-                hash(data['product_type']) % 1000,
-                hash(data['seasonality']) % 1000,
-                float(data['price']),
-                int(data['marketing']),
-                float(data['distribution_channels'])
-            ]])
-            
+            category = determine_category(data['product_type'])
+            if served_model.current:
+                drift_monitor.observe(served_model.current, {**data, 'product_category': category})
+
+            # Repeated configurations skip the model, insights and DB insert
+            cache_key = cache.key(data, model.version)
+            if (cached := cache.get(cache_key)) is not None:
+                return jsonify({**cached, 'cached': True})
+
             # Get prediction score (0-100)
-            success_score = float(model.predict(input_data)[0])
-            success_score = max(0, min(100, success_score))  # Ensure within bounds
+            start = time.perf_counter()
+            raw_score = model.predict_one(data)
+            model_ms = (time.perf_counter() - start) * 1000
+            success_score = max(0, min(100, raw_score))  # Ensure within bounds
             is_success = success_score >= 70
-            category = determine_category(data['product_type'])
+            shadow_scorer.submit({f: data[f] for f in FEATURE_FIELDS}, category, model.version, raw_score, model_ms)
 
-            # Get historical data for insights
-            historical_data = self._get_historical_insights(category)
-            price_stats = self._get_price_stats(category)
-            marketing_stats = self._get_marketing_stats()
+            # Get historical data for insights from the running aggregates
+            stats = productCategoryStats.lookup(category, ALL_CATEGORIES)
+            historical_data = self._get_historical_insights(stats.get(category))
+            price_stats = self._get_price_stats(stats.get(category), category)
+            marketing_stats = self._get_marketing_stats(stats.get(ALL_CATEGORIES))
 
             # Generate comprehensive insights
             insights = {
@@ -99,63 +252,68 @@ class productPredictionAPI(Resource):
                 'marketing_analysis': self._get_marketing_analysis(int(data['marketing']), marketing_stats),
                 'seasonality_analysis': self._get_seasonality_analysis(data['seasonality'], category),
                 'success_probability': self._calculate_success_probability(success_score),
-                'recommendations': self._generate_recommendations(data, success_score, category)
+                'recommendations': self._generate_recommendations(data, success_score, category),
+                'explanation': self._get_explanation(model, data)
             }
 
-            # Save to DB
-            prediction = productSalesPrediction(
-                product_type=data['product_type'],
-                seasonality=data['seasonality'],
-                price=float(data['price']),
-                marketing=int(data['marketing']),
-                distribution_channels=float(data['distribution_channels']),
-                predicted_success=is_success,
-                success_score=success_score,
-                product_category=category
-            )
-            
-            if not prediction.create():
-                raise Exception("Failed to save prediction")
+            # Log the prediction; buffered logging keeps the DB off the response path
+            record = {
+                'product_type': data['product_type'],
+                'seasonality': data['seasonality'],
+                'price': float(data['price']),
+                'marketing': int(data['marketing']),
+                'distribution_channels': float(data['distribution_channels']),
+                'predicted_success': is_success,
+                'success_score': success_score,
+                'product_category': category,
+                'source': 'prediction'
+            }
+            database_id = None
+            if prediction_log is not None:
+                prediction_log.add({**record, 'date_created': datetime.utcnow().isoformat()})
+            else:
+                prediction = productSalesPrediction(**record)
+                if not prediction.create():
+                    raise Exception("Failed to save prediction")
+                database_id = prediction.id
 
-            return jsonify({
+            result = {
                 'success': True,
                 'score': round(success_score, 2),
                 'is_success': is_success,
                 'category': category,
                 'insights': insights,
-                'database_id': prediction.id
-            })
+                'database_id': database_id,
+                'model_version': model.version
+            }
+            cache.put(cache_key, result)
+            return jsonify({**result, 'cached': False})
 
         except Exception as e:
             return {'message': f'Prediction failed: {str(e)}'}, 500
 
-    def _get_historical_insights(self, category):
+    def _get_explanation(self, model, data):
+        """What the model's trees credit each feature with for this product"""
+        explanation = model.explain_one(data)
+        if explanation is None:
+            return None
+        return {**explanation, 'feature_importances': model.importances}
+
+    def _get_historical_insights(self, stats):
         """Get historical data for the category"""
-        successful = productSalesPrediction.query.filter(
-            productSalesPrediction.product_category == category,
-            productSalesPrediction.success_score >= 70
-        ).all()
-        
-        unsuccessful = productSalesPrediction.query.filter(
-            productSalesPrediction.product_category == category,
-            productSalesPrediction.success_score < 70
-        ).all()
+        successful = stats.successful_count if stats else 0
+        unsuccessful = stats.unsuccessful_count if stats else 0
         
         return {
-            'successful_count': len(successful),
-            'unsuccessful_count': len(unsuccessful),
-            'success_rate': len(successful) / (len(successful) + len(unsuccessful)) * 100 if (successful or unsuccessful) else None
+            'successful_count': successful,
+            'unsuccessful_count': unsuccessful,
+            'success_rate': successful / (successful + unsuccessful) * 100 if (successful or unsuccessful) else None
         }
 
-    def _get_price_stats(self, category):
+    def _get_price_stats(self, stats, category):
         """Calculate price statistics for category with better defaults"""
-        prices = [p.price for p in productSalesPrediction.query.filter(
-            productSalesPrediction.product_category == category,
-            productSalesPrediction.success_score >= 70
-        ).all()]
-        
         # Use category base price if no historical data
-        if not prices:
+        if not stats or not stats.price_count:
             base_price = PRODUCT_CATEGORIES.get(category, {}).get('base_price', 10.0)  # Default $10 if no category
             return {
                 'average': base_price,
@@ -165,22 +323,21 @@ class productPredictionAPI(Resource):
             }
         
         return {
-            'average': round(float(np.mean(prices)), 2),
-            'min': round(float(min(prices)), 2),
-            'max': round(float(max(prices)), 2),
-            'std_dev': round(float(np.std(prices)), 2) if len(prices) > 1 else (max(prices)-min(prices))/2
+            'average': round(stats.price_mean, 2),
+            'min': round(stats.price_min, 2),
+            'max': round(stats.price_max, 2),
+            'std_dev': round(stats.std_dev('price'), 2) if stats.price_count > 1 else (stats.price_max-stats.price_min)/2
         }
         
-    def _get_marketing_stats(self):
+    def _get_marketing_stats(self, stats):
         """Calculate overall marketing stats"""
-        marketing_scores = [p.marketing for p in productSalesPrediction.query.filter(
-            productSalesPrediction.success_score >= 70
-        ).all()] or [7]  # Default if no data
+        if not stats or not stats.marketing_count:
+            return {'average': 7.0, 'min': 7, 'max': 7}  # Default if no data
         
         return {
-            'average': round(float(np.mean(marketing_scores)), 1),
-            'min': int(min(marketing_scores)),
-            'max': int(max(marketing_scores))
+            'average': round(stats.marketing_mean, 1),
+            'min': int(stats.marketing_min),
+            'max': int(stats.marketing_max)
         }
 
     def _get_score_analysis(self, score):
@@ -378,91 +535,649 @@ class productPredictionAPI(Resource):
         
         return recs[:10]  # Return maximum 10 most relevant recommendations
 
-class productTrainingAPI(Resource):
+class productBatchPredictionAPI(Resource):
     @cross_origin(origins=["http://127.0.0.1:4887", "https://open-coding-society.github.io"], supports_credentials=True)
     def post(self):
+        """Score a whole catalogue of product candidates with a single model call"""
         data = request.get_json()
-        
-        if not data or 'samples' not in data:
+
+        if not data or not isinstance(data.get('products'), list):
+            return {'message': 'Missing products list'}, 400
+
+        products = data['products']
+        if not products:
+            return {'message': 'No products to score'}, 400
+        if len(products) > MAX_BATCH_SIZE:
+            return {'message': f'Too many products (max {MAX_BATCH_SIZE}, got {len(products)})'}, 413
+        if not all(isinstance(p, dict) for p in products):
+            return {'message': 'Each product must be an object'}, 400
+
+        model, _ = select_model(data)
+        if not model:
+            return {'message': 'Model not trained. Train first with /api/train'}, 503
+
+        try:
+            df, rejected = prepare_product_frame(products)
+
+            if not df.empty:
+                scores = np.clip(model.predict(df), 0, 100)
+                df['success_score'] = scores
+                df['predicted_success'] = scores >= 70
+
+                df['product_category'] = taxonomy.classify_many(df['product_type']).to_numpy()
+                if served_model.current:
+                    drift_monitor.observe_frame(served_model.current, df)
+
+            database_ids = {}
+            if data.get('save', True) and not df.empty:
+                predictions = [productSalesPrediction(**row, source='prediction') for row in df.to_dict('records')]
+                if not productSalesPrediction.create_many(predictions):
+                    raise Exception("Failed to save predictions")
+                database_ids = dict(zip(df.index, (p.id for p in predictions)))
+
+            results = [{
+                'index': int(index),
+                'score': round(float(row.success_score), 2),
+                'is_success': bool(row.predicted_success),
+                'category': row.product_category,
+                'database_id': database_ids.get(index)
+            } for index, row in zip(df.index, df.itertuples())]
+
+            return jsonify({
+                'success': True,
+                'scored': len(results),
+                'results': results,
+                'errors': [{'index': int(i), 'message': 'Missing or invalid fields'} for i in rejected]
+            })
+
+        except Exception as e:
+            return {'message': f'Batch prediction failed: {str(e)}'}, 500
+
+def parse_sweep_axis(field, spec):
+    """Values to try for one sweep axis: either {"values": [...]} or {"min", "max", "steps"}
+
+    Each axis is limited to MAX_BATCH_SIZE values, checked before anything
+    is allocated.
+    """
+    if isinstance(spec, dict) and 'values' in spec:
+        if not isinstance(spec['values'], list):
+            raise ValueError(f'values for {field} must be a list')
+        if len(spec['values']) > MAX_BATCH_SIZE:
+            raise ValueError(f'Too many values for {field} (max {MAX_BATCH_SIZE})')
+        values = np.asarray(spec['values'], dtype=float)
+    elif isinstance(spec, dict) and 'min' in spec and 'max' in spec:
+        steps = int(spec.get('steps', 10))
+        if not 1 <= steps <= MAX_BATCH_SIZE:
+            raise ValueError(f'steps for {field} must be between 1 and {MAX_BATCH_SIZE}')
+        values = np.linspace(float(spec['min']), float(spec['max']), steps)
+    else:
+        raise ValueError(f'Sweep for {field} needs values or min/max/steps')
+    if field == 'marketing':
+        # The model is trained on integer marketing scores
+        values = np.unique(np.round(values))
+    if values.ndim != 1 or not len(values) or not np.isfinite(values).all():
+        raise ValueError(f'Invalid sweep values for {field}')
+    return values
+
+class productSweepAPI(Resource):
+    @cross_origin(origins=["http://127.0.0.1:4887", "https://open-coding-society.github.io"], supports_credentials=True)
+    def post(self):
+        """Score a product over a grid of one or two feature values with a single model call.
+
+        Body: {"product": {...}, "sweep": {"price": {"min": 5, "max": 50,
+        "steps": 10}, "marketing": {"values": [1, 5, 10]}}}. scores is
+        indexed by the swept features in the order listed in features.
+        Nothing is written to the prediction history.
+        """
+        data = request.get_json(silent=True)
+        if not data or not isinstance(data.get('product'), dict) or not isinstance(data.get('sweep'), dict):
+            return {'message': 'Missing product or sweep'}, 400
+
+        product, sweep = data['product'], data['sweep']
+        if not 1 <= len(sweep) <= MAX_SWEEP_AXES:
+            return {'message': f'Sweep one or two of {SWEEP_FIELDS}'}, 400
+        if unknown := [f for f in sweep if f not in SWEEP_FIELDS]:
+            return {'message': 'Unknown sweep fields', 'fields': unknown, 'allowed': SWEEP_FIELDS}, 400
+        if missing := [f for f in FEATURE_FIELDS if f not in product and f not in sweep]:
+            return {'message': 'Missing required fields', 'missing': missing}, 400
+
+        model, _ = select_model(data)
+        if not model:
+            return {'message': 'Model not trained. Train first with /api/train'}, 503
+
+        try:
+            # Axes follow SWEEP_FIELDS order, whatever order the request used
+            axes = {field: parse_sweep_axis(field, sweep[field]) for field in SWEEP_FIELDS if field in sweep}
+            base = {f: product.get(f, 0) for f in FEATURE_FIELDS}
+            df, rejected = prepare_product_frame([base])
+            if rejected:
+                raise ValueError('Invalid product fields')
+        except (TypeError, ValueError) as e:
+            return {'message': str(e)}, 400
+        points = int(np.prod([len(v) for v in axes.values()]))
+        if points > MAX_BATCH_SIZE:
+            return {'message': f'Too many grid points (max {MAX_BATCH_SIZE}, got {points})'}, 413
+
+        try:
+            scores = np.clip(model.predict_grid(df.iloc[0].to_dict(), axes), 0, 100)
+            best = np.unravel_index(np.argmax(scores), scores.shape)
+            best_config = {field: float(values[i]) for (field, values), i in zip(axes.items(), best)}
+
+            return jsonify({
+                'success': True,
+                'model_version': model.version,
+                'category': determine_category(base['product_type']),
+                'features': list(axes),
+                'axes': {field: values.tolist() for field, values in axes.items()},
+                'scores': np.round(scores, 2).tolist(),
+                'best': {**best_config, 'score': round(float(scores[best]), 2),
+                         'is_success': bool(scores[best] >= 70)},
+                'points': points
+            })
+        except Exception as e:
+            return {'message': f'Sweep failed: {str(e)}'}, 500
+
+class productPredictionCacheAPI(Resource):
+    @cross_origin(origins=["http://127.0.0.1:4887", "https://open-coding-society.github.io"], supports_credentials=True)
+    def get(self):
+        """Hit/miss counters of this worker's prediction caches"""
+        return jsonify({**prediction_cache.stats(), COMPACT_CHANNEL: compact_prediction_cache.stats()})
+
+    @cross_origin(origins=["http://127.0.0.1:4887", "https://open-coding-society.github.io"], supports_credentials=True)
+    def delete(self):
+        """Drop every cached prediction in this worker"""
+        prediction_cache.clear()
+        compact_prediction_cache.clear()
+        return jsonify({'success': True})
+
+class productPredictionLogAPI(Resource):
+    @cross_origin(origins=["http://127.0.0.1:4887", "https://open-coding-society.github.io"], supports_credentials=True)
+    def get(self):
+        """Pending and written rows of this worker's prediction log buffer"""
+        if prediction_log is None:
+            return jsonify({'buffered': False})
+        return jsonify({'buffered': True, **prediction_log.stats()})
+
+    @cross_origin(origins=["http://127.0.0.1:4887", "https://open-coding-society.github.io"], supports_credentials=True)
+    def post(self):
+        """Write this worker's buffered predictions now"""
+        if prediction_log is not None and not prediction_log.flush():
+            return {'message': 'Failed to write buffered predictions'}, 500
+        return jsonify({'success': True})
+
+class productTrainingAPI(Resource):
+    @cross_origin(origins=["http://127.0.0.1:4887", "https://open-coding-society.github.io"], supports_credentials=True)
+    def post(self):
+        """Store training samples and queue a training job.
+
+        Samples are posted as JSON ({"samples": [...], "mode": ...}) or streamed
+        as a text/csv or application/x-ndjson body with the options in the
+        query string. They are validated with pandas and inserted in chunks
+        within a single transaction; invalid samples are skipped.
+
+        mode 'full' (default) fits a new model on the submitted samples;
+        'incremental' adds add_trees trees fitted on training rows stored since
+        the current model was trained; 'window' refits on the newest window
+        stored training rows. Samples are optional for the stored-row modes.
+        backend picks the estimator for 'full' and 'window' (see
+        ESTIMATOR_BACKENDS); incremental training needs a forest.
+        """
+        streamed = request.mimetype in STREAM_FORMATS
+        if streamed:
+            request.max_content_length = app.config['PRODUCT_TRAINING_MAX_UPLOAD']
+            data = request.args
+        else:
+            data = request.get_json(silent=True)
+        mode = (data or {}).get('mode', 'full')
+        backend = (data or {}).get('backend', DEFAULT_BACKEND)
+
+        if mode not in TRAINING_MODES:
+            return {'message': f'Unknown training mode {mode}', 'modes': TRAINING_MODES}, 400
+        if backend not in ESTIMATOR_BACKENDS:
+            return {'message': f'Unknown estimator backend {backend}', 'backends': list(ESTIMATOR_BACKENDS)}, 400
+        if not streamed and (not data or ('samples' not in data and mode == 'full')):
             return {'message': 'Missing samples data'}, 400
+        model = served_model.current
+        if mode == 'incremental' and (not model or model.version == 'legacy'):
+            return {'message': 'Incremental training needs a trained model. Run a full training first'}, 409
+        if mode == 'incremental' and model.metadata.get('backend', DEFAULT_BACKEND) != 'forest':
+            return {'message': 'Incremental training needs a forest model'}, 409
+        try:
+            add_trees = int(data.get('add_trees', 50)) if mode == 'incremental' else None
+            window = int(data.get('window', 50000)) if mode == 'window' else None
+        except (TypeError, ValueError):
+            return {'message': 'add_trees and window must be integers'}, 400
+        if (add_trees is not None and add_trees < 1) or (window is not None and window < 1):
+            return {'message': 'add_trees and window must be positive'}, 400
 
-        valid_samples = []
-        required_fields = ['product_type', 'seasonality', 'price', 
-                         'marketing', 'distribution_channels', 'success_score']
-        
-        for sample in data['samples']:
-            if not all(field in sample for field in required_fields):
-                continue
-            
-            try:
-                category = determine_category(sample['product_type'])
-                success_score = float(sample['success_score'])
-                
-                prediction = productSalesPrediction(
-                    product_type=sample['product_type'],
-                    seasonality=sample['seasonality'],
-                    price=float(sample['price']),
-                    marketing=int(sample['marketing']),
-                    distribution_channels=float(sample['distribution_channels']),
-                    predicted_success=success_score >= 70,
-                    success_score=success_score,
-                    product_category=category
-                )
-                
-                if prediction.create():
-                    valid_samples.append({
-                        'type_hash': hash(sample['product_type']) % 1000,
-                        'season_hash': hash(sample['seasonality']) % 1000,
-                        'price': float(sample['price']),
-                        'marketing': int(sample['marketing']),
-                        'distribution': float(sample['distribution_channels']),
-                        'success_score': success_score
-                    })
-            except Exception as e:
-                print(f"Skipping invalid sample: {str(e)}")
-
-        if len(valid_samples) < 5:
+        if streamed:
+            chunks = self._read_stream(request.mimetype)
+        else:
+            chunks = [data['samples']] if data.get('samples') else []
+        try:
+            valid_samples, watermark = self._ingest(chunks)
+        except Exception as e:
+            db.session.rollback()
+            return {'message': f'Failed to store training samples: {str(e)}'}, 400
+
+        if mode == 'full' and len(valid_samples) < 5:
             return {'message': f'Insufficient data (need 5, got {len(valid_samples)})'}, 400
 
         try:
-            df = pd.DataFrame(valid_samples)
-            X = df[['type_hash', 'season_hash', 'price', 'marketing', 'distribution']]
-            y = df['success_score'].clip(0, 100)  # Ensure scores are between 0-100
-
-            global model
-            model = RandomForestRegressor(
-                n_estimators=200,
-                min_samples_leaf=3,
-                max_depth=10,
-                random_state=42,
-                max_features=0.8
-            )
-            model.fit(X, y)
-            
-            joblib.dump(model, "titanic_product_model.pkl")
+            db_url = db.engine.url.render_as_string(hide_password=False)
+            if mode == 'incremental':
+                parameters = {'mode': mode, 'add_trees': add_trees}
+                task = (update_product_model, registry, db_url, add_trees)
+            elif mode == 'window':
+                parameters = {'mode': mode, 'window': window, 'backend': backend, **ESTIMATOR_BACKENDS[backend]}
+                task = (refit_product_window, registry, db_url, window, None, backend)
+            else:
+                parameters = {'mode': mode, 'backend': backend, **ESTIMATOR_BACKENDS[backend]}
+                task = (train_product_model, valid_samples, registry, None, watermark, backend)
 
-            y_pred = model.predict(X)
-            return jsonify({
+            job = productTrainingJob(uuid.uuid4().hex, samples_used=len(valid_samples), parameters=parameters)
+            if not job.create():
+                raise Exception("Failed to save training job")
+
+            _submit_training_job(job, *task)
+
+            response = jsonify({
                 'success': True,
+                'job_id': job.id,
+                'status': job.status,
+                'status_url': f'/api/train/{job.id}',
                 'samples_used': len(valid_samples),
-                'r2_score': round(r2_score(y, y_pred), 4),
-                'mae': round(mean_absolute_error(y, y_pred), 2),
-                'categories_trained': len(set(p.product_category for p in productSalesPrediction.query.all()))
+                'categories_trained': productCategoryStats.query.filter(
+                    productCategoryStats.product_category != ALL_CATEGORIES
+                ).count()
             })
+            response.status_code = 202
+            return response
 
         except Exception as e:
             return {'message': f'Training failed: {str(e)}'}, 500
 
+    @staticmethod
+    def _read_stream(mimetype):
+        """Iterate over a streamed CSV or NDJSON upload in frames of INGEST_CHUNK_SIZE rows"""
+        if mimetype == 'text/csv':
+            return pd.read_csv(request.stream, chunksize=INGEST_CHUNK_SIZE)
+        return pd.read_json(request.stream, lines=True, chunksize=INGEST_CHUNK_SIZE)
+
+    @staticmethod
+    def _ingest(chunks):
+        """Validate and bulk insert sample chunks, committing once at the end.
+
+        Returns the valid samples as one frame and the id of the newest stored
+        training row (the training watermark).
+        """
+        kept = []
+        for chunk in chunks:
+            df, _ = prepare_product_frame(chunk, with_score=True)
+            if df.empty:
+                continue
+            df['product_category'] = taxonomy.classify_many(df['product_type']).to_numpy()
+            df['predicted_success'] = df['success_score'] >= 70
+            df['source'] = 'training'
+            productSalesPrediction.bulk_insert(df)
+            kept.append(df[FEATURE_FIELDS + ['success_score', 'product_category']])
+
+        watermark = None
+        if kept:
+            watermark = db.session.query(db.func.max(productSalesPrediction.id)).filter(
+                productSalesPrediction.source == 'training'
+            ).scalar()
+        db.session.commit()
+        samples = pd.concat(kept, ignore_index=True) if kept else pd.DataFrame(columns=FEATURE_FIELDS + ['success_score', 'product_category'])
+        return samples, watermark
+
+class productTrainingJobAPI(Resource):
+    @cross_origin(origins=["http://127.0.0.1:4887", "https://open-coding-society.github.io"], supports_credentials=True)
+    def get(self, job_id):
+        """Report the status, metrics and model version of a training job"""
+        job = productTrainingJob.query.get(job_id)
+        if not job:
+            return {'message': f'Training job {job_id} not found'}, 404
+
+        result = job.read()
+        future = _training_futures.get(job_id)
+        if result['status'] == 'queued' and future is not None and future.running():
+            result['status'] = 'running'
+        return jsonify(result)
+
+class productModelVersionsAPI(Resource):
+    @cross_origin(origins=["http://127.0.0.1:4887", "https://open-coding-society.github.io"], supports_credentials=True)
+    def get(self):
+        """List published model versions and the one being served"""
+        try:
+            model = served_model.current
+            return jsonify({
+                'current': registry.current_version(),
+                'serving': model.version if model else None,
+                'channels': {channel: registry.current_version(channel) for channel in registry.channels()},
+                'versions': [registry.read_meta(v) for v in reversed(registry.versions())]
+            })
+        except Exception as e:
+            return {'message': f'Failed to list model versions: {str(e)}'}, 500
+
+class productModelShadowAPI(Resource):
+    @cross_origin(origins=["http://127.0.0.1:4887", "https://open-coding-society.github.io"], supports_credentials=True)
+    def get(self):
+        """Score deltas and latencies of the shadow model against the served ones"""
+        version = registry.current_version(SHADOW_CHANNEL)
+        try:
+            return jsonify({
+                'candidate': version,
+                'worker': shadow_scorer.stats(),
+                'summary': productShadowResult.summary(version) if version else None
+            })
+        except Exception as e:
+            return {'message': f'Failed to summarise shadow results: {str(e)}'}, 500
+
+    @cross_origin(origins=["http://127.0.0.1:4887", "https://open-coding-society.github.io"], supports_credentials=True)
+    def post(self):
+        """Start shadowing a published version"""
+        data = request.get_json(silent=True)
+        if not data or 'version' not in data:
+            return {'message': 'Missing version'}, 400
+        try:
+            registry.activate(data['version'], channel=SHADOW_CHANNEL)
+        except ValueError as e:
+            return {'message': str(e)}, 404
+        served_shadow.refresh(force=True)
+        return jsonify({'success': True, 'candidate': data['version']})
+
+    @cross_origin(origins=["http://127.0.0.1:4887", "https://open-coding-society.github.io"], supports_credentials=True)
+    def delete(self):
+        """Stop shadowing; recorded results are kept"""
+        registry.deactivate(SHADOW_CHANNEL)
+        served_shadow.refresh(force=True)
+        return jsonify({'success': True})
+
+class productModelDriftAPI(Resource):
+    @cross_origin(origins=["http://127.0.0.1:4887", "https://open-coding-society.github.io"], supports_credentials=True)
+    def get(self):
+        """How far this worker's recent inputs have drifted from the served model's training data.
+
+        drift_score is the largest per-feature PSI; retrain_recommended is set
+        once enough products were seen and the drift is significant.
+        """
+        model = served_model.current
+        if not model:
+            return {'message': 'Model not trained. Train first with /api/train'}, 503
+        return jsonify(drift_monitor.report(model))
+
+class productModelImportancesAPI(Resource):
+    @cross_origin(origins=["http://127.0.0.1:4887", "https://open-coding-society.github.io"], supports_credentials=True)
+    def get(self):
+        """Global feature importances of the model being served"""
+        model = served_model.current
+        if not model:
+            return {'message': 'Model not trained. Train first with /api/train'}, 503
+        return jsonify({'model_version': model.version, 'feature_importances': model.importances})
+
+class productModelActivateAPI(Resource):
+    @cross_origin(origins=["http://127.0.0.1:4887", "https://open-coding-society.github.io"], supports_credentials=True)
+    def post(self):
+        """Make a published version current (e.g. to roll back), or serve it on a channel"""
+        data = request.get_json()
+        if not data or 'version' not in data:
+            return {'message': 'Missing version'}, 400
+        channel = data.get('channel')
+        if channel not in (None, COMPACT_CHANNEL):
+            return {'message': f'Unknown channel {channel}'}, 400
+
+        try:
+            registry.activate(data['version'], channel=channel)
+        except ValueError as e:
+            return {'message': str(e)}, 404
+
+        served_model.refresh(force=True)
+        served_compact.refresh(force=True)
+        return jsonify({'success': True, 'current': data['version'], 'channel': channel})
+
+class productModelEvaluationAPI(Resource):
+    @cross_origin(origins=["http://127.0.0.1:4887", "https://open-coding-society.github.io"], supports_credentials=True)
+    def post(self):
+        """Queue a cross-validated evaluation of a model version (the current one by default)"""
+        data = request.get_json(silent=True) or {}
+        version = data.get('version') or registry.current_version()
+        strategy = data.get('strategy', 'kfold')
+        if not version or version not in registry.versions():
+            return {'message': f'Unknown model version {version}'}, 404
+        if strategy not in EVALUATION_STRATEGIES:
+            return {'message': f'Unknown evaluation strategy {strategy}', 'strategies': EVALUATION_STRATEGIES}, 400
+
+        try:
+            folds = int(data.get('folds', 5))
+            window = int(data['window']) if data.get('window') is not None else None
+        except (TypeError, ValueError):
+            return {'message': 'folds and window must be integers'}, 400
+        if folds < 2 or (window is not None and window < 1):
+            return {'message': 'folds must be at least 2 and window positive'}, 400
+
+        try:
+            parameters = {'mode': 'evaluate', 'version': version, 'strategy': strategy,
+                          'folds': folds, 'window': window}
+            job = productTrainingJob(uuid.uuid4().hex, parameters=parameters)
+            if not job.create():
+                raise Exception("Failed to save evaluation job")
+
+            db_url = db.engine.url.render_as_string(hide_password=False)
+            _submit_training_job(job, evaluate_product_model, registry, db_url, version, strategy, folds, window)
+
+            response = jsonify({
+                'success': True,
+                'job_id': job.id,
+                'status': job.status,
+                'status_url': f'/api/train/{job.id}',
+                'report_url': f'/api/model/{version}/evaluation'
+            })
+            response.status_code = 202
+            return response
+        except Exception as e:
+            return {'message': f'Evaluation failed: {str(e)}'}, 500
+
+class productModelCompactAPI(Resource):
+    @cross_origin(origins=["http://127.0.0.1:4887", "https://open-coding-society.github.io"], supports_credentials=True)
+    def post(self):
+        """Queue building a compact model that fits a latency/size budget.
+
+        Body: {"version": ..., "strategy": "subset" | "distill",
+        "max_trees": ..., "latency_ms": ..., "max_bytes": ..., "window": ...}.
+        version defaults to the current one. The job's metrics include the
+        accuracy/latency trade-off of every candidate; a candidate within the
+        budget is activated on the compact channel, which requests opt into
+        with {"model": "compact"}.
+        """
+        data = request.get_json(silent=True) or {}
+        version = data.get('version') or registry.current_version()
+        strategy = data.get('strategy', 'subset')
+        if not version or version not in registry.versions():
+            return {'message': f'Unknown model version {version}'}, 404
+        if strategy not in COMPACT_STRATEGIES:
+            return {'message': f'Unknown compaction strategy {strategy}', 'strategies': COMPACT_STRATEGIES}, 400
+
+        try:
+            budget = {
+                'max_trees': int(data['max_trees']) if data.get('max_trees') is not None else None,
+                'latency_ms': float(data['latency_ms']) if data.get('latency_ms') is not None else None,
+                'max_bytes': int(data['max_bytes']) if data.get('max_bytes') is not None else None
+            }
+            window = int(data.get('window', 20000))
+        except (TypeError, ValueError):
+            return {'message': 'Invalid budget'}, 400
+        if window < 1 or any(value is not None and value <= 0 for value in budget.values()):
+            return {'message': 'window and budget limits must be positive'}, 400
+
+        try:
+            parameters = {'mode': 'compact', 'version': version, 'strategy': strategy,
+                          'window': window, **budget}
+            job = productTrainingJob(uuid.uuid4().hex, parameters=parameters)
+            if not job.create():
+                raise Exception("Failed to save compaction job")
+
+            db_url = db.engine.url.render_as_string(hide_password=False)
+            _submit_training_job(job, compact_product_model, registry, db_url, version,
+                                 strategy, budget, window, COMPACT_CHANNEL)
+
+            response = jsonify({
+                'success': True,
+                'job_id': job.id,
+                'status': job.status,
+                'status_url': f'/api/train/{job.id}'
+            })
+            response.status_code = 202
+            return response
+        except Exception as e:
+            return {'message': f'Compaction failed: {str(e)}'}, 500
+
+class productModelReportAPI(Resource):
+    @cross_origin(origins=["http://127.0.0.1:4887", "https://open-coding-society.github.io"], supports_credentials=True)
+    def get(self, version, report):
+        """A stored evaluation or backend benchmark report of a model version"""
+        if version not in registry.versions():
+            return {'message': f'Unknown model version {version}'}, 404
+        stored = registry.read_report(version, report)
+        if stored is None:
+            return {'message': f'Model version {version} has no {report} report'}, 404
+        return jsonify(stored)
+
+def encode_history_cursor(prediction):
+    """Opaque cursor pointing just after a history record"""
+    key = f"{prediction.date_created.isoformat()}|{prediction.id}"
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+def decode_history_cursor(cursor):
+    """(date_created, id) of the record a cursor points after"""
+    try:
+        date_created, prediction_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(date_created), int(prediction_id)
+    except ValueError:
+        raise ValueError('Invalid cursor')
+
+def parse_history_filters(args):
+    """History query filters from request arguments; raises ValueError on bad values"""
+    def number(name):
+        return float(args[name]) if args.get(name) not in (None, '') else None
+
+    def date(name):
+        return datetime.fromisoformat(args[name]) if args.get(name) else None
+
+    try:
+        return {
+            'category': args.get('category') or None,
+            'min_score': number('min_score'),
+            'max_score': number('max_score'),
+            'start': date('start'),
+            'end': date('end')
+        }
+    except ValueError as e:
+        raise ValueError(f'Invalid filter: {e}')
+
 class productHistoryAPI(Resource):
     @cross_origin(origins=["http://127.0.0.1:4887", "https://open-coding-society.github.io"], supports_credentials=True)
     def get(self):
+        """Prediction history, newest first, one page at a time.
+
+        Filters: category, min_score/max_score (inclusive) and start/end
+        (ISO dates; start inclusive, end exclusive). Pass the returned
+        next_cursor as cursor to get the following page. With format=ndjson
+        every matching record after cursor is streamed, one JSON object per
+        line, reading HISTORY_EXPORT_PAGE rows at a time.
+        """
+        try:
+            filters = parse_history_filters(request.args)
+            after = decode_history_cursor(request.args['cursor']) if request.args.get('cursor') else None
+            limit = min(int(request.args.get('limit', HISTORY_PAGE_SIZE)), MAX_HISTORY_PAGE_SIZE)
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        if limit < 1:
+            return {'message': 'limit must be positive'}, 400
+
+        if request.args.get('format') == 'ndjson':
+            return Response(stream_with_context(self._export(filters, after)), mimetype='application/x-ndjson')
+
         try:
-            predictions = productSalesPrediction.query.order_by(productSalesPrediction.date_created.desc()).all()
-            return jsonify([p.read() for p in predictions])
+            predictions = productSalesPrediction.history(after=after, limit=limit + 1, **filters)
+            has_more = len(predictions) > limit
+            predictions = predictions[:limit]
+            return jsonify({
+                'predictions': [p.read() for p in predictions],
+                'next_cursor': encode_history_cursor(predictions[-1]) if has_more else None,
+                'has_more': has_more
+            })
         except Exception as e:
             return {'message': f'Failed to fetch history: {str(e)}'}, 500
 
+    @staticmethod
+    def _export(filters, after):
+        while True:
+            predictions = productSalesPrediction.history(after=after, limit=HISTORY_EXPORT_PAGE, **filters)
+            if not predictions:
+                return
+            yield ''.join(json.dumps(p.read()) + '\n' for p in predictions)
+            last = predictions[-1]
+            after = (last.date_created, last.id)
+            # Let the page's objects go before reading the next one
+            db.session.expunge_all()
+            if len(predictions) < HISTORY_EXPORT_PAGE:
+                return
+
+class productAnalyticsRollupAPI(Resource):
+    @cross_origin(origins=["http://127.0.0.1:4887", "https://open-coding-society.github.io"], supports_credentials=True)
+    def get(self):
+        """Daily or weekly success rate, score and price series from the rollup tables.
+
+        Parameters: period (day or week, default day), category (repeatable;
+        default every category combined), start/end (ISO dates; start
+        inclusive, end exclusive) and limit (newest buckets per category,
+        at most ROLLUP_MAX_BUCKETS). Each series is a bounded index range
+        read, so the cost does not grow with the prediction history.
+        """
+        period = request.args.get('period', 'day')
+        if period not in ROLLUP_PERIODS:
+            return {'message': f"period must be one of {', '.join(ROLLUP_PERIODS)}"}, 400
+        categories = request.args.getlist('category') or [ALL_CATEGORIES]
+        if len(categories) > MAX_ROLLUP_CATEGORIES:
+            return {'message': f'At most {MAX_ROLLUP_CATEGORIES} categories per request'}, 400
+        try:
+            start = date.fromisoformat(request.args['start']) if request.args.get('start') else None
+            end = date.fromisoformat(request.args['end']) if request.args.get('end') else None
+            limit = min(int(request.args.get('limit', ROLLUP_MAX_BUCKETS)), ROLLUP_MAX_BUCKETS)
+        except ValueError as e:
+            return {'message': f'Invalid parameter: {e}'}, 400
+        if limit < 1:
+            return {'message': 'limit must be positive'}, 400
+
+        try:
+            return jsonify({
+                'period': period,
+                'series': {
+                    category: [row.read() for row in productPredictionRollup.series(
+                        period, category=category, start=start, end=end, limit=limit)]
+                    for category in categories
+                }
+            })
+        except Exception as e:
+            return {'message': f'Failed to fetch rollups: {str(e)}'}, 500
+
 # Register endpoints
 api.add_resource(productPredictionAPI, '/predict')
+api.add_resource(productBatchPredictionAPI, '/predict/batch')
+api.add_resource(productSweepAPI, '/predict/sweep')
+api.add_resource(productPredictionCacheAPI, '/predict/cache')
+api.add_resource(productPredictionLogAPI, '/predict/log')
 api.add_resource(productTrainingAPI, '/train')
-api.add_resource(productHistoryAPI, '/history')
\ No newline at end of file
+api.add_resource(productTrainingJobAPI, '/train/<string:job_id>')
+api.add_resource(productHistoryAPI, '/history')
+api.add_resource(productAnalyticsRollupAPI, '/analytics/rollups')
+api.add_resource(productModelVersionsAPI, '/model/versions')
+api.add_resource(productModelActivateAPI, '/model/activate')
+api.add_resource(productModelImportancesAPI, '/model/importances')
+api.add_resource(productModelShadowAPI, '/model/shadow')
+api.add_resource(productModelDriftAPI, '/model/drift')
+api.add_resource(productModelEvaluationAPI, '/model/evaluate')
+api.add_resource(productModelCompactAPI, '/model/compact')
+api.add_resource(productModelReportAPI,
+                 f'/model/<string:version>/<any({EVALUATION_REPORT}, {BENCHMARK_REPORT}):report>')
\ No newline at end of file
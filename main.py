@@ -11,6 +11,7 @@ from urllib.parse import urljoin, urlparse
 from flask import abort, redirect, render_template, request, send_from_directory, url_for, jsonify
 from flask_login import current_user, login_user, logout_user
 from flask.cli import AppGroup
+import click
 from flask_login import current_user, login_required
 from flask import current_app
 from flask import g
@@ -44,7 +45,11 @@ from api.nestPost import nestPost_api  # Custom format
 from api.messages_api import messages_api  # Messages
 from api.flashcard import flashcard_api
 from api.vote import vote_api
-from api.studylog import product_api
+from api.studylog import product_api, registry as product_registry, taxonomy as product_taxonomy
+from api.product_training import benchmark_backends, ESTIMATOR_BACKENDS
+from api.product_scoring import score_csv, SCORING_CHUNK_SIZE
+from api.model_serving import model_serving_api
+from api.intent_router import Intent, IntentRouter, benchmark as benchmark_intent_router
 from api.gradelog import gradelog_api
 from api.profile import profile_api
 from api.tips import tips_api
@@ -64,7 +69,7 @@ from model.post import Post, initPosts
 from model.nestPost import NestPost, initNestPosts
 from model.vote import Vote, initVotes
 from model.flashcard import Flashcard, initFlashcards
-from model.studylog import productSalesPrediction, initproductSalesPredictions
+from model.studylog import productSalesPrediction, productCategoryStats, productPredictionRollup, initproductSalesPredictions
 from model.gradelog import initGradeLog
 from model.profiles import Profile, initProfiles
 from model.chatlog import ChatLog, initChatLogs
@@ -72,6 +77,7 @@ from model.gradelog import GradeLog
 from model.deck import Deck, initDecks
 from model.calendar import Event, initEvents
 from model.leaderboard import LeaderboardEntry, initLeaderboard
+from model.synthetic import generate_synthetic_data, SYNTHETIC_BATCH_SIZE
 # server only Views
 
 # register URIs for API endpoints
@@ -87,6 +93,7 @@ app.register_blueprint(nestImg_api)
 app.register_blueprint(vote_api)
 app.register_blueprint(flashcard_api)
 app.register_blueprint(product_api)
+app.register_blueprint(model_serving_api)
 app.register_blueprint(gradelog_api)
 app.register_blueprint(profile_api)
 app.register_blueprint(tips_api)
@@ -279,6 +286,28 @@ def generate_data():
     initproductSalesPredictions()
     initLeaderboard()
 
+@custom_cli.command('generate_synthetic_data')
+@click.option('--users', type=int, default=1000, show_default=True)
+@click.option('--decks', type=int, default=2000, show_default=True)
+@click.option('--flashcards', type=int, default=20000, show_default=True)
+@click.option('--events', type=int, default=5000, show_default=True)
+@click.option('--shipments', type=int, default=5000, show_default=True)
+@click.option('--predictions', type=int, default=50000, show_default=True)
+@click.option('--chat-logs', type=int, default=5000, show_default=True)
+@click.option('--seed', type=int, default=42, show_default=True, help='Same seed and counts, same rows')
+@click.option('--days', type=int, default=365, show_default=True, help='Span of the generated timestamps')
+@click.option('--batch-size', type=int, default=SYNTHETIC_BATCH_SIZE, show_default=True, help='Rows per insert')
+def generate_synthetic_data_command(users, decks, flashcards, events, shipments, predictions, chat_logs, seed,
+                                    days, batch_size):
+    """Bulk-insert reproducible synthetic data for benchmarks and capacity planning"""
+    try:
+        written = generate_synthetic_data(users=users, decks=decks, flashcards=flashcards, events=events,
+                                          shipments=shipments, predictions=predictions, chat_logs=chat_logs,
+                                          seed=seed, days=days, batch_size=batch_size)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    print(f"Generated {sum(written.values())} rows with seed {seed}.")
+
 
 def backup_database(db_uri, backup_uri):
     if backup_uri:
@@ -348,6 +377,64 @@ def restore_data_command():
     data = load_data_from_json()
     restore_data(data)
 
+@custom_cli.command('rebuild_product_stats')
+def rebuild_product_stats():
+    """Backfill the per-category prediction stats from the full history"""
+    with app.app_context():
+        db.create_all()
+        productCategoryStats.rebuild()
+    print("Product category stats rebuilt.")
+
+@custom_cli.command('rebuild_product_rollups')
+@click.option('--chunk-size', type=int, default=50000, help='History rows read per chunk')
+def rebuild_product_rollups(chunk_size):
+    """Backfill the daily and weekly prediction rollups from the full history"""
+    with app.app_context():
+        db.create_all()
+        productPredictionRollup.rebuild(chunk_size=chunk_size)
+    print("Product prediction rollups rebuilt.")
+
+@custom_cli.command('benchmark_product_backends')
+@click.option('--backend', 'backends', multiple=True, type=click.Choice(list(ESTIMATOR_BACKENDS)),
+              help='Backend to benchmark (repeatable; default: all)')
+@click.option('--window', type=int, default=None, help='Only use the newest WINDOW training rows')
+def benchmark_product_backends(backends, window):
+    """Time and score each estimator backend on the stored training rows"""
+    with app.app_context():
+        db_url = db.engine.url.render_as_string(hide_password=False)
+    report = benchmark_backends(db_url, backends=list(backends) or None, window=window, registry=product_registry)
+    print(f"Trained on {report['train_rows']} rows, tested on {report['test_rows']}")
+    print(f"{'backend':<24}{'r2':>8}{'mae':>8}{'fit s':>9}{'predict s':>11}{'1-row ms':>10}")
+    for result in report['results']:
+        print(f"{result['backend']:<24}{result['r2_score']:>8}{result['mae']:>8}{result['fit_seconds']:>9}"
+              f"{result['predict_seconds']:>11}{result['latency_ms']:>10}")
+    if report.get('model_version'):
+        print(f"Recorded with model version {report['model_version']}")
+
+@custom_cli.command('score_products')
+@click.argument('input_path', type=click.Path(exists=True, dir_okay=False))
+@click.argument('output_path', type=click.Path(dir_okay=False))
+@click.option('--chunk-size', type=int, default=SCORING_CHUNK_SIZE, help='Rows read and scored per chunk')
+@click.option('--workers', type=int, default=None, help='Scoring processes (default: one per CPU)')
+@click.option('--version', default=None, help='Model version to score with (default: the active one)')
+def score_products(input_path, output_path, chunk_size, workers, version):
+    """Score a CSV of product candidates and write scores and categories to OUTPUT_PATH"""
+    version = version or product_registry.current_version()
+    if version:
+        if version not in product_registry.versions():
+            raise click.BadParameter(f"Unknown model version {version}", param_hint='--version')
+        model_path = product_registry.version_dir(version)
+    elif product_registry.legacy_path and os.path.exists(product_registry.legacy_path):
+        model_path = product_registry.legacy_path
+    else:
+        raise click.ClickException("No product model has been trained yet")
+
+    print(f"Scoring {input_path} with model {version or 'legacy'}")
+    summary = score_csv(input_path, output_path, model_path, product_taxonomy.paths, chunk_size=chunk_size,
+                        workers=workers, progress=lambda rows: print(f"  {rows} rows scored"))
+    print(f"Wrote {summary['rows']} rows to {output_path} ({summary['invalid']} invalid) "
+          f"in {summary['seconds']}s with {summary['workers']} workers")
+
 app.cli.add_command(custom_cli)
 
 # Respond to "what can you do" or similar questions
@@ -378,12 +465,11 @@ def list_user_flashcards():
 
 
 def list_all_user_products():
-    user_id = g.current_user.id
-    user = User.query.get(user_id)  # Corrected line
-    user_name = user.name if user else f"User #{user_id}"
+    user = g.current_user
+    user_name = user.name or f"User #{user.id}"
 
-    items = Flashcard.query.filter_by(_user_id=user_id).all()
-    groups = Deck.query.filter_by(_user_id=user_id).all()
+    # Items and their groups in one query
+    items = Flashcard.query.options(joinedload(Flashcard.deck)).filter_by(_user_id=user.id).all()
 
     response_lines = [f"{user_name}'s products are:\n"]
 
@@ -393,8 +479,7 @@ def list_all_user_products():
 
     for item in items:
         data = item.read()
-        group = Deck.query.get(item._deck_id) if hasattr(item, '_deck_id') and item._deck_id else None
-        group_name = group.title if group else "None"
+        group_name = item.deck.title if item.deck else "None"
 
         response_lines.append(f"Group name: {group_name}")
         response_lines.append(f"Item name: {data['title']}")
@@ -406,7 +491,7 @@ def list_all_user_products():
 
 
 def get_item_group(item_title):
-    item = Flashcard.query.filter_by(_title=item_title).first()
+    item = Flashcard.query.filter(db.func.lower(Flashcard._title) == item_title.lower()).first()
     if not item:
         return f"No item titled '{item_title}' found."
 
@@ -427,7 +512,10 @@ def create_flashcard(title, content, user_id, deck_title=None):
     return flashcard.create()
 
 def delete_flashcard(title, user_id):
-    flashcard = Flashcard.query.filter_by(_title=title, _user_id=user_id).first()
+    flashcard = Flashcard.query.filter(
+        Flashcard._user_id == user_id,
+        db.func.lower(Flashcard._title) == title.lower()
+    ).first()
     if flashcard:
         flashcard.delete()
         return f"Item '{title}' was deleted."
@@ -505,225 +593,234 @@ def delete_group(title, user_id):
 
 pending_intents = {}  # temp dictionary: user_id -> {'action': ..., 'title': ..., ...}
 
-def handle_internal_intents(question: str):
-    q = question.lower()
-    user_id = g.current_user.id
+# Intent handlers: handler(match, question, user_id) -> reply, match from the intent's pattern
 
+def predict_product_intent(match, q, user_id):
+    if not match:
+        return (
+            "To make a prediction, use this format:\n\n"
+            "**predict product: type=fruit, seasonality=summer, price=5.99, marketing=7, distribution=8**\n\n"
+            "Example:\n"
+            "`predict product: type=chocolate bar, seasonality=holiday, price=3.99, marketing=8, distribution=9`"
+        )
 
-    if "predict product" in q or "product prediction" in q:
-        import re
-        import requests
+    # Prepare payload
+    payload = {
+        "product_type": match.group(1).strip(),
+        "seasonality": match.group(2).strip(),
+        "price": float(match.group(3)),
+        "marketing": int(match.group(4)),
+        "distribution_channels": int(match.group(5))
+    }
+
+    # Choose correct URL depending on deployment
+    if request.host.startswith("127.") or "localhost" in request.host:
+        predict_url = "http://127.0.0.1:8212/api/predict"
+    else:
+        predict_url = "https://optivize.stu.nighthawkcodingsociety.com/api/predict"
 
-        # Match input pattern like: predict product: type=fruit, seasonality=summer, price=5.99, marketing=7, distribution=8
-        match = re.search(
-            r'predict product.*type\s*=\s*(.*?),\s*seasonality\s*=\s*(.*?),\s*price\s*=\s*([\d\.]+),\s*marketing\s*=\s*(\d+),\s*distribution\s*=\s*(\d+)', 
-            q
+    try:
+        response = requests.post(predict_url, json=payload)
+        response.raise_for_status()
+        result = response.json()
+
+        # Format reply
+        reply = (
+            f"🎯 **Prediction Result:**\n"
+            f"- Score: {result.get('score', 'N/A')}\n"
+            f"- Success: {'✅ Yes' if result.get('is_success') else '❌ No'}\n"
+            f"- Category: {result.get('category', 'N/A')}\n\n"
+            f"**Top Recommendations:**\n"
         )
+        for rec in result.get('insights', {}).get('recommendations', []):
+            reply += f"- {rec}\n"
 
-        if match:
-            product_type = match.group(1).strip()
-            seasonality = match.group(2).strip()
-            price = float(match.group(3))
-            marketing = int(match.group(4))
-            distribution_channels = int(match.group(5))
-
-            # Prepare payload
-            payload = {
-                "product_type": product_type,
-                "seasonality": seasonality,
-                "price": price,
-                "marketing": marketing,
-                "distribution_channels": distribution_channels
-            }
+        return reply
 
-            # Choose correct URL depending on deployment
-            if request.host.startswith("127.") or "localhost" in request.host:
-                predict_url = "http://127.0.0.1:8212/api/predict"
-            else:
-                predict_url = "https://optivize.stu.nighthawkcodingsociety.com/api/predict"
-
-            try:
-                response = requests.post(predict_url, json=payload)
-                response.raise_for_status()
-                result = response.json()
-
-                # Format reply
-                reply = (
-                    f"🎯 **Prediction Result:**\n"
-                    f"- Score: {result.get('score', 'N/A')}\n"
-                    f"- Success: {'✅ Yes' if result.get('is_success') else '❌ No'}\n"
-                    f"- Category: {result.get('category', 'N/A')}\n\n"
-                    f"**Top Recommendations:**\n"
-                )
-                for rec in result.get('insights', {}).get('recommendations', []):
-                    reply += f"- {rec}\n"
-
-                return reply
-
-            except Exception as e:
-                print("Prediction API error:", e)
-                return f"⚠️ Error contacting Prediction API: {str(e)}\n\nPlease check your input or try again."
+    except Exception as e:
+        print("Prediction API error:", e)
+        return f"⚠️ Error contacting Prediction API: {str(e)}\n\nPlease check your input or try again."
 
-        else:
-            return (
-                "To make a prediction, use this format:\n\n"
-                "**predict product: type=fruit, seasonality=summer, price=5.99, marketing=7, distribution=8**\n\n"
-                "Example:\n"
-                "`predict product: type=chocolate bar, seasonality=holiday, price=3.99, marketing=8, distribution=9`"
-            )
+def add_item_to_group_intent(match, q, user_id):
+    try:
+        title = match.group(1).strip()
+        group_title = match.group(2).strip()
+        content = "(no content)"  # default content
 
+        create_flashcard(title=title, content=content, user_id=user_id, deck_title=group_title)
+        return f"Okay, I've added '{title}' to the '{group_title}' group."
+    except Exception as e:
+        print("Add item to group failed:", e)
+        return "Sorry, I couldn't parse that. Try: 'add item apple to group snacks'"
+
+def create_item_intent(match, q, user_id):
+    if not match:
+        return "Sorry, I couldn't parse the item creation request."
+    title = match.group(1).strip()
+    content = match.group(2).strip()
+
+    pending_intents[user_id] = {
+        "action": "create_item_waiting_for_group",
+        "title": title,
+        "content": content
+    }
+    return f"What group would you like to add the item '{title}' to?"
+
+def update_group_intent(match, q, user_id):
+    if not match:
+        return "Sorry, I couldn't update the group title. Try saying: 'update group OldName to NewName'."
+    return update_group(match.group(1).strip(), match.group(2).strip(), user_id)
+
+def update_item_intent(match, q, user_id):
+    if not match:
+        return "Sorry, I couldn't parse the item update. Please use: 'update item [title] with new content [content]'"
+    title = match.group(1).strip()
+    try:
+        # Item and its group in one query; titles match case-insensitively, as in update_flashcard
+        flashcard = Flashcard.query.options(joinedload(Flashcard.deck)).filter(
+            Flashcard._user_id == user_id,
+            db.func.lower(Flashcard._title) == title.lower()
+        ).first()
+        if not flashcard:
+            return f"No item titled '{title}' found."
+
+        group_name = flashcard.deck.title if flashcard.deck else "None"
+        update_flashcard(flashcard._title, match.group(2).strip(), user_id)
+        return f"Item '{title}' was updated successfully (previously in group '{group_name}')."
 
-    # Shortcut: "add item [title] to group [group]"
-    if "add item" in q and "to group" in q:
-        try:
-            title = q.split("add item")[1].split("to group")[0].strip()
-            group_title = q.split("to group")[1].strip()
-            content = "(no content)"  # default content
+    except Exception as e:
+        print("Update item error:", e)
+        return "Something went wrong while updating the item."
 
-            create_flashcard(title=title, content=content, user_id=user_id, deck_title=group_title)
-            return f"Okay, I've added '{title}' to the '{group_title}' group."
-        except Exception as e:
-            print("Add item to group failed:", e)
-            return "Sorry, I couldn't parse that. Try: 'add item apple to group snacks'"
+def delete_item_intent(match, q, user_id):
+    try:
+        title = match.group(1).strip()
+        flashcard = Flashcard.query.options(joinedload(Flashcard.deck)).filter(
+            Flashcard._user_id == user_id,
+            db.func.lower(Flashcard._title) == title.lower()
+        ).first()
+        if not flashcard:
+            return f"No item titled '{title}' found."
+
+        group_name = flashcard.deck.title if flashcard.deck else "None"
+
+        pending_intents[user_id] = {
+            "action": "confirm_delete",
+            "title": title
+        }
+        return f"Item '{title}' is in group '{group_name}'. Do you want to delete it? (yes/no)"
+    except Exception:
+        return "Sorry, I couldn't process your delete request."
+
+def create_group_intent(match, q, user_id):
+    try:
+        return create_group(match.group(1).strip(), user_id)
+    except Exception:
+        return "Sorry, couldn't create the group."
 
+def delete_group_intent(match, q, user_id):
+    try:
+        return delete_group(match.group(1).strip(), user_id)
+    except Exception:
+        return "Sorry, couldn't delete the group."
+
+def item_group_intent(match, q, user_id):
+    if not match:
+        return "Which item? Try asking 'What group is [item] in?'"
+    return get_item_group(match.group(1).strip())
+
+def list_products_intent(match, q, user_id):
+    return list_all_user_products()
+
+def second_product_intent(match, q, user_id):
+    flashcard = Flashcard.query.filter_by(_user_id=user_id).order_by(Flashcard.id).offset(1).first()
+    if flashcard:
+        fc = flashcard.read()
+        return f"Your second product is:\n- {fc['title']}: {fc['content']}"
+    return "You don't have a second product."
+
+# Checked in this order; the first intent a question triggers handles it
+INTENTS = [
+    Intent('predict_product', ['predict product', 'product prediction'], predict_product_intent,
+           pattern=r'predict product.*type\s*=\s*(.*?),\s*seasonality\s*=\s*(.*?),\s*price\s*=\s*([\d\.]+),\s*marketing\s*=\s*(\d+),\s*distribution\s*=\s*(\d+)',
+           before_followup=True),
+    Intent('add_item_to_group', ['add item'], add_item_to_group_intent,
+           pattern=r'add item(.*?)to group(.*)', requires=r'to group', before_followup=True),
+    Intent('create_item', ['add new item', 'create item'], create_item_intent,
+           pattern=r'called(.*?)with content(.*)'),
+    Intent('update_group', ['update group'], update_group_intent,
+           pattern=r'update group (.+?) to (.+)', requires=r'to'),
+    Intent('update_item', ['update item'], update_item_intent,
+           pattern=r'update item (.+?) with new content (.+)'),
+    Intent('delete_item', ['delete item'], delete_item_intent, pattern=r'delete item(.*)'),
+    Intent('create_group', ['create group', 'add group'], create_group_intent, pattern=r'(?:create|add) group(.*)'),
+    Intent('delete_group', ['delete group'], delete_group_intent, pattern=r'delete group(.*)'),
+    Intent('item_group', ['what group is'], item_group_intent,
+           pattern=r'what group is (.+?)(?:\s+in)?\W*$', requires=r'in'),
+    Intent('list_products', ['list', 'show', 'give', 'state', 'display'], list_products_intent,
+           requires=r'item|product|flashcard|deck|group'),
+    Intent('second_product', ['2nd product', 'second product'], second_product_intent)
+]
+intent_router = IntentRouter(INTENTS)
+
+# Questions timed by `flask custom benchmark_intents`, including one that matches no intent
+INTENT_BENCHMARK_QUESTIONS = [
+    "predict product: type=chocolate bar, seasonality=holiday, price=3.99, marketing=8, distribution=9",
+    "add item apple to group snacks",
+    "update item apple with new content 12 / restock weekly",
+    "delete item apple",
+    "what group is apple in?",
+    "show me all my items",
+    "what is your second product",
+    "how do i price a seasonal product for the holidays without hurting margins?"
+]
+
+@custom_cli.command('benchmark_intents')
+@click.option('--number', type=int, default=10000, show_default=True, help='Resolutions timed per question')
+def benchmark_intents(number):
+    """Time intent resolution for typical assistant questions"""
+    for question, micros in benchmark_intent_router(intent_router, INTENT_BENCHMARK_QUESTIONS, number).items():
+        intent, _ = intent_router.resolve(question)
+        print(f"{micros:8.2f} us  {intent.name if intent else '-':<18} {question[:60]}")
 
-    # Step 1: Handle follow-ups for staged actions
+def handle_internal_intents(question: str):
+    q = question.lower()
+    user_id = g.current_user.id
+    # Dispatch on the lower-cased text; arguments are taken from the question as typed
+    intent, match = intent_router.resolve(question)
+
+    if intent and intent.before_followup:
+        return intent.handler(match, q, user_id)
+
+    # Handle follow-ups for staged actions
     if user_id in pending_intents:
-        intent = pending_intents[user_id]
+        staged = pending_intents[user_id]
 
         # Follow-up: Create item with group
-        if intent['action'] == 'create_item_waiting_for_group':
+        if staged['action'] == 'create_item_waiting_for_group':
             group_title = q.strip()
             create_flashcard(
-                title=intent['title'],
-                content=intent['content'],
+                title=staged['title'],
+                content=staged['content'],
                 user_id=user_id,
                 deck_title=group_title
             )
             del pending_intents[user_id]
-            return f"Item '{intent['title']}' was created and added to group '{group_title}'."
+            return f"Item '{staged['title']}' was created and added to group '{group_title}'."
 
         # Follow-up: Confirm delete
-        if intent['action'] == 'confirm_delete':
+        if staged['action'] == 'confirm_delete':
             confirmed = q.strip().lower() in ["yes", "confirm", "delete"]
             if confirmed:
-                delete_flashcard(intent['title'], user_id)
+                delete_flashcard(staged['title'], user_id)
                 del pending_intents[user_id]
-                return f"Item '{intent['title']}' has been deleted."
+                return f"Item '{staged['title']}' has been deleted."
             else:
                 del pending_intents[user_id]
                 return "Okay, deletion canceled."
 
-    # Step 2: Main command parsing
-
-    # Create item with follow-up for group
-    if "add new item" in q or "create item" in q:
-        try:
-            parts = q.split("called")[1].split("with content")
-            title = parts[0].strip()
-            content = parts[1].strip()
-
-            pending_intents[user_id] = {
-                "action": "create_item_waiting_for_group",
-                "title": title,
-                "content": content
-            }
-            return f"What group would you like to add the item '{title}' to?"
-        except Exception:
-            return "Sorry, I couldn't parse the item creation request."
-
-    import re
-
-    if "update group" in q and "to" in q:
-        match = re.search(r"update group (.+?) to (.+)", q, re.IGNORECASE)
-        if match:
-            old_title = match.group(1).strip()
-            new_title = match.group(2).strip()
-            return update_group(old_title, new_title, user_id)
-        else:
-            return "Sorry, I couldn't update the group title. Try saying: 'update group OldName to NewName'."
-
-
-    import re
-
-    if "update item" in q:
-        try:
-            # Use regex to robustly extract title and new content
-            match = re.search(r"update item (.+?) with new content (.+)", question, re.IGNORECASE)
-            if not match:
-                return "Sorry, I couldn't parse the item update. Please use: 'update item [title] with new content [content]'"
-
-            title = match.group(1).strip()
-            new_content = match.group(2).strip()
-
-            flashcard = Flashcard.query.filter_by(_title=title, _user_id=user_id).first()
-            if not flashcard:
-                return f"No item titled '{title}' found."
-
-            group = Deck.query.get(flashcard._deck_id) if flashcard._deck_id else None
-            group_name = group.title if group else "None"
-
-            update_flashcard(title, new_content, user_id)
-            return f"Item '{title}' was updated successfully (previously in group '{group_name}')."
-
-        except Exception as e:
-            print("Update item error:", e)
-            return "Something went wrong while updating the item."
-
-
-
-    # Delete item with confirmation
-    if "delete item" in q:
-        try:
-            title = q.split("delete item")[-1].strip()
-            flashcard = Flashcard.query.filter_by(_title=title, _user_id=user_id).first()
-            if not flashcard:
-                return f"No item titled '{title}' found."
-
-            group = Deck.query.get(flashcard._deck_id) if flashcard._deck_id else None
-            group_name = group.title if group else "None"
-
-            pending_intents[user_id] = {
-                "action": "confirm_delete",
-                "title": title
-            }
-            return f"Item '{title}' is in group '{group_name}'. Do you want to delete it? (yes/no)"
-        except Exception:
-            return "Sorry, I couldn't process your delete request."
-
-    # Create group
-    if "create group" in q or "add group" in q:
-        try:
-            title = q.split("group")[-1].strip()
-            return create_group(title, user_id)
-        except Exception:
-            return "Sorry, couldn't create the group."
-
-    # Delete group
-    if "delete group" in q:
-        try:
-            title = q.split("delete group")[-1].strip()
-            return delete_group(title, user_id)
-        except Exception:
-            return "Sorry, couldn't delete the group."
-
-    # Get group of item
-    if "what group is" in q and "in" in q:
-        item_title = q.split("group is")[-1].replace("in", "").strip()
-        return get_item_group(item_title)
-
-    # List items and groups
-    if any(k in q for k in ["list", "show", "give", "state", "display"]) and any(p in q for p in ["item", "product", "flashcard", "deck", "group"]):
-        return list_all_user_products()
-
-    # Get second item
-    if "2nd product" in q or "second product" in q:
-        flashcards = Flashcard.query.filter_by(_user_id=user_id).all()
-        if len(flashcards) >= 2:
-            fc = flashcards[1].read()
-            return f"Your second product is:\n- {fc['title']}: {fc['content']}"
-        return "You don't have a second product."
-
+    if intent:
+        return intent.handler(match, q, user_id)
     return None
 
 
@@ -743,7 +840,7 @@ def ai_homework_help():
     question = data.get("question", "").lower()
 
     # Check for internal intents first
-    response_text = handle_internal_intents(question)
+    response_text = handle_internal_intents(data.get("question", ""))
     if response_text:
         new_entry = ChatLog(question=question, response=response_text)
         new_entry.create()
@@ -1,7 +1,20 @@
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import mysql, postgresql, sqlite
 from datetime import datetime
+import math
+import numpy as np
+import pandas as pd
 from __init__ import app, db
 
+# Score at or above which a prediction counts as a success
+SUCCESS_THRESHOLD = 70
+# Key of the stats row aggregating every category
+ALL_CATEGORIES = '__all__'
+# Upper bounds of the price buckets in prediction rollups; the last bucket is open-ended
+ROLLUP_PRICE_EDGES = [5, 10, 25, 50, 100, 250, 500]
+# Most buckets one rollup series returns
+ROLLUP_MAX_BUCKETS = 366
+
 class productSalesPrediction(db.Model):
     """
     Product Sales Prediction Model
@@ -16,9 +29,12 @@ class productSalesPrediction(db.Model):
         predicted_success (bool): Whether prediction was successful
         success_score (float): Prediction success score (0-100)
         product_category (str): Product category
+        source (str): 'training' for /api/train samples, 'prediction' for served predictions
         date_created (DateTime): When record was created
     """
     __tablename__ = 'product_sales_predictions'
+    # History pages are read newest first by (date_created, id)
+    __table_args__ = (db.Index('ix_product_sales_predictions_created_id', 'date_created', 'id'),)
 
     id = db.Column(db.Integer, primary_key=True)
     product_type = db.Column(db.String(255), nullable=True)  # Made nullable for initialization
@@ -29,11 +45,12 @@ class productSalesPrediction(db.Model):
     predicted_success = db.Column(db.Boolean, nullable=True)  # Made nullable for initialization
     success_score = db.Column(db.Float, nullable=True)       # Made nullable for initialization
     product_category = db.Column(db.String(50), nullable=True) # Made nullable for initialization
+    source = db.Column(db.String(20), nullable=True)
     date_created = db.Column(db.DateTime, default=datetime.utcnow)
 
     def __init__(self, product_type=None, seasonality=None, price=None, marketing=None, 
                  distribution_channels=None, predicted_success=None, success_score=None, 
-                 product_category=None):
+                 product_category=None, source=None):
         self.product_type = product_type
         self.seasonality = seasonality
         self.price = price
@@ -42,11 +59,14 @@ class productSalesPrediction(db.Model):
         self.predicted_success = predicted_success
         self.success_score = success_score
         self.product_category = product_category
+        self.source = source
 
     def create(self):
         """Create a new prediction record"""
         try:
             db.session.add(self)
+            productCategoryStats.record([self.read()])
+            productPredictionRollup.record([self.read()])
             db.session.commit()
             return self
         except IntegrityError as e:
@@ -58,6 +78,36 @@ class productSalesPrediction(db.Model):
             app.logger.error(f"Unexpected error while saving prediction: {e}")
             return None
 
+    @staticmethod
+    def create_many(predictions):
+        """Create several prediction records in a single transaction"""
+        try:
+            db.session.add_all(predictions)
+            productCategoryStats.record([p.read() for p in predictions])
+            productPredictionRollup.record([p.read() for p in predictions])
+            db.session.commit()
+            return predictions
+        except IntegrityError as e:
+            db.session.rollback()
+            app.logger.error(f"IntegrityError while saving predictions: {e}")
+            return None
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Unexpected error while saving predictions: {e}")
+            return None
+
+    @staticmethod
+    def bulk_insert(df):
+        """Insert a frame of prediction rows with one executemany; the caller commits"""
+        columns = ['product_type', 'seasonality', 'price', 'marketing', 'distribution_channels',
+                   'predicted_success', 'success_score', 'product_category', 'source']
+        if 'date_created' in df:
+            columns.append('date_created')
+        db.session.execute(db.insert(productSalesPrediction), df[columns].to_dict('records'))
+        productCategoryStats.record(df)
+        productPredictionRollup.record(df)
+        return len(df)
+
     def read(self):
         """Return dictionary representation of the record"""
         return {
@@ -70,6 +120,7 @@ class productSalesPrediction(db.Model):
             "predicted_success": self.predicted_success,
             "success_score": self.success_score,
             "product_category": self.product_category,
+            "source": self.source,
             "date_created": self.date_created.isoformat() if self.date_created else None
         }
 
@@ -87,6 +138,557 @@ class productSalesPrediction(db.Model):
         db.session.commit()
         return None
 
+    @staticmethod
+    def history(after=None, limit=100, category=None, min_score=None, max_score=None, start=None, end=None):
+        """One page of records, newest first, ordered by (date_created, id).
+
+        after is the (date_created, id) of the last record of the previous
+        page, so each page is an index range scan however deep it is and
+        stays stable while new records arrive. start is inclusive, end
+        exclusive.
+        """
+        query = productSalesPrediction.query
+        if category:
+            query = query.filter(productSalesPrediction.product_category == category)
+        if min_score is not None:
+            query = query.filter(productSalesPrediction.success_score >= min_score)
+        if max_score is not None:
+            query = query.filter(productSalesPrediction.success_score <= max_score)
+        if start is not None:
+            query = query.filter(productSalesPrediction.date_created >= start)
+        if end is not None:
+            query = query.filter(productSalesPrediction.date_created < end)
+        if after is not None:
+            after_date, after_id = after
+            query = query.filter(db.or_(
+                productSalesPrediction.date_created < after_date,
+                db.and_(productSalesPrediction.date_created == after_date,
+                        productSalesPrediction.id < after_id)
+            ))
+        return query.order_by(productSalesPrediction.date_created.desc(),
+                              productSalesPrediction.id.desc()).limit(limit).all()
+
+class RunningStatsMixin:
+    """Welford count/mean/M2/min/max aggregates stored as <field>_count, <field>_mean, ... columns"""
+
+    def _merge(self, field, count, mean, m2, minimum, maximum):
+        """Combine a batch summary into a running aggregate (Chan et al.)"""
+        if not count:
+            return
+        n_a = getattr(self, f'{field}_count')
+        n = n_a + count
+        delta = mean - getattr(self, f'{field}_mean')
+        setattr(self, f'{field}_mean', getattr(self, f'{field}_mean') + delta * count / n)
+        setattr(self, f'{field}_m2', getattr(self, f'{field}_m2') + m2 + delta * delta * n_a * count / n)
+        setattr(self, f'{field}_count', n)
+        current_min = getattr(self, f'{field}_min')
+        current_max = getattr(self, f'{field}_max')
+        setattr(self, f'{field}_min', minimum if current_min is None else min(current_min, minimum))
+        setattr(self, f'{field}_max', maximum if current_max is None else max(current_max, maximum))
+
+    def std_dev(self, field):
+        """Population standard deviation of a tracked field"""
+        count = getattr(self, f'{field}_count')
+        return math.sqrt(getattr(self, f'{field}_m2') / count) if count else 0.0
+
+    @classmethod
+    def _insert_missing(cls, rows):
+        """Insert new, still empty aggregate rows, skipping any that already exist.
+
+        Two writers can see the same key missing at once; with a plain add
+        one of them fails on the unique key. The insert ignores conflicts
+        instead, so the caller can then lock every row with a re-select.
+        """
+        values = [{column.name: getattr(row, column.name) for column in cls.__table__.columns
+                   if column.name != 'id'} for row in rows]
+        dialect = db.session.get_bind().dialect.name
+        if dialect == 'mysql':
+            statement = mysql.insert(cls).on_duplicate_key_update(id=cls.__table__.c.id)
+        elif dialect == 'postgresql':
+            statement = postgresql.insert(cls).on_conflict_do_nothing()
+        else:
+            statement = sqlite.insert(cls).on_conflict_do_nothing()
+        db.session.execute(statement, values)
+
+    @staticmethod
+    def _summarize(values):
+        """Batch summary of a grouped column, in the form _merge takes"""
+        return pd.DataFrame({
+            'count': values.count(),
+            'mean': values.mean(),
+            'm2': values.var(ddof=0) * values.count(),
+            'min': values.min(),
+            'max': values.max()
+        })
+
+class productCategoryStats(RunningStatsMixin, db.Model):
+    """
+    Running aggregates of the prediction history per product category
+
+    Kept up to date as predictions are inserted, so insights never have to
+    scan product_sales_predictions. Price and marketing aggregates cover
+    successful predictions only and use Welford's count/mean/M2 form.
+    The row keyed ALL_CATEGORIES aggregates across every category.
+
+    Attributes:
+        id (int): Primary key
+        product_category (str): Product category, or ALL_CATEGORIES
+        successful_count (int): Predictions scoring at or above SUCCESS_THRESHOLD
+        unsuccessful_count (int): Predictions scoring below SUCCESS_THRESHOLD
+        price_mean, price_m2, price_min, price_max (float): Price aggregates
+        marketing_mean, marketing_m2, marketing_min, marketing_max (float): Marketing aggregates
+    """
+    __tablename__ = 'product_category_stats'
+
+    id = db.Column(db.Integer, primary_key=True)
+    product_category = db.Column(db.String(50), unique=True, nullable=False)
+    successful_count = db.Column(db.Integer, default=0, nullable=False)
+    unsuccessful_count = db.Column(db.Integer, default=0, nullable=False)
+    price_count = db.Column(db.Integer, default=0, nullable=False)
+    price_mean = db.Column(db.Float, default=0.0, nullable=False)
+    price_m2 = db.Column(db.Float, default=0.0, nullable=False)
+    price_min = db.Column(db.Float, nullable=True)
+    price_max = db.Column(db.Float, nullable=True)
+    marketing_count = db.Column(db.Integer, default=0, nullable=False)
+    marketing_mean = db.Column(db.Float, default=0.0, nullable=False)
+    marketing_m2 = db.Column(db.Float, default=0.0, nullable=False)
+    marketing_min = db.Column(db.Float, nullable=True)
+    marketing_max = db.Column(db.Float, nullable=True)
+
+    def __init__(self, product_category):
+        self.product_category = product_category
+        self.successful_count = 0
+        self.unsuccessful_count = 0
+        self.price_count = 0
+        self.price_mean = 0.0
+        self.price_m2 = 0.0
+        self.marketing_count = 0
+        self.marketing_mean = 0.0
+        self.marketing_m2 = 0.0
+
+    def read(self):
+        """Return dictionary representation of the aggregates"""
+        return {
+            "product_category": self.product_category,
+            "successful_count": self.successful_count,
+            "unsuccessful_count": self.unsuccessful_count,
+            "price": {
+                "count": self.price_count,
+                "mean": self.price_mean,
+                "std_dev": self.std_dev('price'),
+                "min": self.price_min,
+                "max": self.price_max
+            },
+            "marketing": {
+                "count": self.marketing_count,
+                "mean": self.marketing_mean,
+                "std_dev": self.std_dev('marketing'),
+                "min": self.marketing_min,
+                "max": self.marketing_max
+            }
+        }
+
+    @staticmethod
+    def lookup(*categories):
+        """Fetch the stats rows for the given categories, keyed by category"""
+        rows = productCategoryStats.query.filter(
+            productCategoryStats.product_category.in_(categories)
+        ).all()
+        return {row.product_category: row for row in rows}
+
+    @staticmethod
+    def record(rows):
+        """Fold new prediction rows into the aggregates; the caller commits.
+
+        Accepts a DataFrame or list of dicts with product_category, price,
+        marketing and success_score. Each batch is summarised per category
+        with pandas and merged in, so the cost depends on the batch size only.
+        """
+        df = pd.DataFrame(rows, columns=['product_category', 'price', 'marketing', 'success_score'])
+        df = df.dropna(subset=['product_category', 'success_score'])
+        if df.empty:
+            return
+
+        df = pd.concat([df, df.assign(product_category=ALL_CATEGORIES)], ignore_index=True)
+        df['successful'] = df['success_score'] >= SUCCESS_THRESHOLD
+        outcomes = df.groupby('product_category')['successful'].agg(['sum', 'count'])
+
+        successful = df[df['successful']]
+        summaries = {}
+        for field in ['price', 'marketing']:
+            summaries[field] = RunningStatsMixin._summarize(
+                successful.dropna(subset=[field]).groupby('product_category')[field])
+
+        existing = productCategoryStats.query.filter(
+            productCategoryStats.product_category.in_(outcomes.index.tolist())
+        ).with_for_update().all()
+        stats = {row.product_category: row for row in existing}
+        missing = [category for category in outcomes.index if category not in stats]
+        if missing:
+            productCategoryStats._insert_missing([productCategoryStats(category) for category in missing])
+            stats.update({row.product_category: row for row in productCategoryStats.query.filter(
+                productCategoryStats.product_category.in_(missing)
+            ).with_for_update()})
+
+        for category, outcome in outcomes.iterrows():
+            row = stats[category]
+            row.successful_count += int(outcome['sum'])
+            row.unsuccessful_count += int(outcome['count'] - outcome['sum'])
+            for field, summary in summaries.items():
+                if category in summary.index:
+                    s = summary.loc[category]
+                    row._merge(field, int(s['count']), float(s['mean']), float(s['m2']),
+                               float(s['min']), float(s['max']))
+
+    @staticmethod
+    def rebuild(chunk_size=50000):
+        """Recompute every aggregate from product_sales_predictions in chunks"""
+        try:
+            productCategoryStats.query.delete()
+            query = db.select(
+                productSalesPrediction.product_category,
+                productSalesPrediction.price,
+                productSalesPrediction.marketing,
+                productSalesPrediction.success_score
+            )
+            for chunk in pd.read_sql(query, db.session.connection(), chunksize=chunk_size):
+                productCategoryStats.record(chunk)
+                db.session.flush()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Error rebuilding product category stats: {e}")
+            raise
+
+class productPredictionRollup(RunningStatsMixin, db.Model):
+    """
+    Daily and weekly aggregates of the prediction history per product category
+
+    Maintained alongside productCategoryStats as rows are inserted, one row
+    per (period, bucket_start, product_category), so dashboards read a
+    handful of rows instead of scanning product_sales_predictions. Weeks
+    start on Monday; buckets are in UTC like date_created. The
+    ALL_CATEGORIES rows aggregate every category.
+
+    Attributes:
+        id (int): Primary key
+        period (str): 'day' or 'week'
+        bucket_start (Date): First day of the bucket
+        product_category (str): Product category, or ALL_CATEGORIES
+        successful_count (int): Predictions scoring at or above SUCCESS_THRESHOLD
+        unsuccessful_count (int): Predictions scoring below SUCCESS_THRESHOLD
+        score_mean, score_m2, score_min, score_max (float): Success score aggregates
+        price_mean, price_m2, price_min, price_max (float): Price aggregates
+        price_histogram (list): Price counts per ROLLUP_PRICE_EDGES bucket
+    """
+    __tablename__ = 'product_prediction_rollups'
+    # Dashboard reads are range scans of one (period, category) by bucket_start
+    __table_args__ = (db.UniqueConstraint('period', 'product_category', 'bucket_start',
+                                          name='uq_product_prediction_rollups_bucket'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    period = db.Column(db.String(10), nullable=False)
+    bucket_start = db.Column(db.Date, nullable=False)
+    product_category = db.Column(db.String(50), nullable=False)
+    successful_count = db.Column(db.Integer, default=0, nullable=False)
+    unsuccessful_count = db.Column(db.Integer, default=0, nullable=False)
+    score_count = db.Column(db.Integer, default=0, nullable=False)
+    score_mean = db.Column(db.Float, default=0.0, nullable=False)
+    score_m2 = db.Column(db.Float, default=0.0, nullable=False)
+    score_min = db.Column(db.Float, nullable=True)
+    score_max = db.Column(db.Float, nullable=True)
+    price_count = db.Column(db.Integer, default=0, nullable=False)
+    price_mean = db.Column(db.Float, default=0.0, nullable=False)
+    price_m2 = db.Column(db.Float, default=0.0, nullable=False)
+    price_min = db.Column(db.Float, nullable=True)
+    price_max = db.Column(db.Float, nullable=True)
+    price_histogram = db.Column(db.JSON, nullable=True)
+
+    def __init__(self, period, bucket_start, product_category):
+        self.period = period
+        self.bucket_start = bucket_start
+        self.product_category = product_category
+        self.successful_count = 0
+        self.unsuccessful_count = 0
+        self.score_count = 0
+        self.score_mean = 0.0
+        self.score_m2 = 0.0
+        self.price_count = 0
+        self.price_mean = 0.0
+        self.price_m2 = 0.0
+        self.price_histogram = [0] * (len(ROLLUP_PRICE_EDGES) + 1)
+
+    def read(self):
+        """Return dictionary representation of the bucket"""
+        total = self.successful_count + self.unsuccessful_count
+        bounds = [None] + ROLLUP_PRICE_EDGES + [None]
+        return {
+            "period": self.period,
+            "bucket_start": self.bucket_start.isoformat(),
+            "product_category": self.product_category,
+            "count": total,
+            "successful_count": self.successful_count,
+            "success_rate": self.successful_count / total if total else None,
+            "score": {
+                "mean": self.score_mean if self.score_count else None,
+                "std_dev": self.std_dev('score'),
+                "min": self.score_min,
+                "max": self.score_max
+            },
+            "price": {
+                "count": self.price_count,
+                "mean": self.price_mean if self.price_count else None,
+                "std_dev": self.std_dev('price'),
+                "min": self.price_min,
+                "max": self.price_max,
+                "histogram": [{"min": bounds[i], "max": bounds[i + 1], "count": count}
+                              for i, count in enumerate(self.price_histogram or [])]
+            }
+        }
+
+    @staticmethod
+    def record(rows):
+        """Fold new prediction rows into their day and week buckets; the caller commits.
+
+        Accepts a DataFrame or list of dicts with product_category, price,
+        success_score and date_created (rows without one count as now).
+        Like productCategoryStats.record, each batch is summarised with
+        pandas first, so the cost depends on the batch size only.
+        """
+        df = pd.DataFrame(rows, columns=['product_category', 'price', 'success_score', 'date_created'])
+        df = df.dropna(subset=['product_category', 'success_score'])
+        if df.empty:
+            return
+
+        created = pd.to_datetime(df['date_created'], errors='coerce').fillna(pd.Timestamp(datetime.utcnow()))
+        day = created.dt.normalize()
+        week = day - pd.to_timedelta(day.dt.weekday, unit='D')
+        df = df.assign(successful=df['success_score'] >= SUCCESS_THRESHOLD,
+                       price=pd.to_numeric(df['price'], errors='coerce'))
+        df = pd.concat([df.assign(period='day', bucket_start=day.dt.date),
+                        df.assign(period='week', bucket_start=week.dt.date)], ignore_index=True)
+        df = pd.concat([df, df.assign(product_category=ALL_CATEGORIES)], ignore_index=True)
+
+        keys = ['period', 'bucket_start', 'product_category']
+        grouped = df.groupby(keys)
+        outcomes = grouped['successful'].agg(['sum', 'count'])
+        scores = RunningStatsMixin._summarize(grouped['success_score'])
+        priced = df.dropna(subset=['price'])
+        prices = RunningStatsMixin._summarize(priced.groupby(keys)['price'])
+        bins = priced.assign(price_bin=np.searchsorted(ROLLUP_PRICE_EDGES, priced['price'], side='right'))
+        histograms = {}
+        for (*key, price_bin), count in bins.groupby(keys + ['price_bin']).size().items():
+            histograms.setdefault(tuple(key), {})[price_bin] = int(count)
+
+        existing = productPredictionRollup.query.filter(
+            productPredictionRollup.period.in_(['day', 'week']),
+            productPredictionRollup.bucket_start.in_(df['bucket_start'].unique().tolist()),
+            productPredictionRollup.product_category.in_(df['product_category'].unique().tolist())
+        ).with_for_update().all()
+        rollups = {(row.period, row.bucket_start, row.product_category): row for row in existing}
+        missing = [key for key in outcomes.index if key not in rollups]
+        if missing:
+            productPredictionRollup._insert_missing([productPredictionRollup(*key) for key in missing])
+            periods, bucket_starts, categories = (list(set(column)) for column in zip(*missing))
+            rollups.update({(row.period, row.bucket_start, row.product_category): row
+                            for row in productPredictionRollup.query.filter(
+                                productPredictionRollup.period.in_(periods),
+                                productPredictionRollup.bucket_start.in_(bucket_starts),
+                                productPredictionRollup.product_category.in_(categories)
+                            ).with_for_update()})
+
+        # One aligned frame, walked once; per-key .loc on a MultiIndex is far slower
+        summary = outcomes.join(scores.add_prefix('score_')).join(prices.add_prefix('price_'))
+        for key, s in zip(summary.index, summary.itertuples(index=False)):
+            row = rollups[key]
+            row.successful_count += int(s.sum)
+            row.unsuccessful_count += int(s.count - s.sum)
+            row._merge('score', int(s.score_count), s.score_mean, s.score_m2, s.score_min, s.score_max)
+            if s.price_count > 0:
+                row._merge('price', int(s.price_count), s.price_mean, s.price_m2, s.price_min, s.price_max)
+                histogram = list(row.price_histogram or [0] * (len(ROLLUP_PRICE_EDGES) + 1))
+                for price_bin, count in histograms[key].items():
+                    histogram[price_bin] += count
+                # Reassigned rather than mutated so the JSON column is marked dirty
+                row.price_histogram = histogram
+
+    @staticmethod
+    def series(period, category=ALL_CATEGORIES, start=None, end=None, limit=ROLLUP_MAX_BUCKETS):
+        """The newest limit buckets of one period and category, oldest first.
+
+        start and end are dates; start is inclusive, end exclusive.
+        """
+        query = productPredictionRollup.query.filter(
+            productPredictionRollup.period == period,
+            productPredictionRollup.product_category == category
+        )
+        if start is not None:
+            query = query.filter(productPredictionRollup.bucket_start >= start)
+        if end is not None:
+            query = query.filter(productPredictionRollup.bucket_start < end)
+        rows = query.order_by(productPredictionRollup.bucket_start.desc()).limit(limit).all()
+        return rows[::-1]
+
+    @staticmethod
+    def rebuild(chunk_size=50000):
+        """Recompute every bucket from product_sales_predictions in chunks"""
+        try:
+            productPredictionRollup.query.delete()
+            query = db.select(
+                productSalesPrediction.product_category,
+                productSalesPrediction.price,
+                productSalesPrediction.success_score,
+                productSalesPrediction.date_created
+            )
+            for chunk in pd.read_sql(query, db.session.connection(), chunksize=chunk_size):
+                productPredictionRollup.record(chunk)
+                db.session.flush()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Error rebuilding product prediction rollups: {e}")
+            raise
+
+class productTrainingJob(db.Model):
+    """
+    Background training job for the product sales model
+
+    Attributes:
+        id (str): Job identifier returned by /api/train
+        status (str): queued, running, succeeded or failed
+        samples_used (int): Number of samples submitted for training
+        parameters (dict): Estimator parameters requested for the job
+        metrics (dict): Training metrics reported when the job finished
+        model_version (str): Version of the model the job produced
+        error (str): Failure message, if the job failed
+        date_created (DateTime): When the job was submitted
+        date_finished (DateTime): When the job finished
+    """
+    __tablename__ = 'product_training_jobs'
+
+    id = db.Column(db.String(32), primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    samples_used = db.Column(db.Integer, nullable=True)
+    parameters = db.Column(db.JSON, nullable=True)
+    metrics = db.Column(db.JSON, nullable=True)
+    model_version = db.Column(db.String(64), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    date_created = db.Column(db.DateTime, default=datetime.utcnow)
+    date_finished = db.Column(db.DateTime, nullable=True)
+
+    def __init__(self, id, samples_used=None, parameters=None):
+        self.id = id
+        self.status = 'queued'
+        self.samples_used = samples_used
+        self.parameters = parameters
+
+    def create(self):
+        """Create a new job record"""
+        try:
+            db.session.add(self)
+            db.session.commit()
+            return self
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Unexpected error while saving training job: {e}")
+            return None
+
+    def read(self):
+        """Return dictionary representation of the job"""
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "samples_used": self.samples_used,
+            "parameters": self.parameters,
+            "metrics": self.metrics,
+            "model_version": self.model_version,
+            "error": self.error,
+            "date_created": self.date_created.isoformat() if self.date_created else None,
+            "date_finished": self.date_finished.isoformat() if self.date_finished else None
+        }
+
+    def update(self, data):
+        """Update fields with provided dictionary"""
+        for key, value in data.items():
+            if hasattr(self, key):
+                setattr(self, key, value)
+        db.session.commit()
+        return self
+
+class productShadowResult(db.Model):
+    """
+    A served prediction replayed against a shadow (candidate) model
+
+    Attributes:
+        id (int): Primary key
+        candidate_version (str): Version of the shadow model
+        primary_version (str): Version that served the request
+        product_category (str): Category of the product
+        primary_score (float): Raw score returned to the client
+        candidate_score (float): Raw score of the shadow model
+        primary_ms (float): Model latency of the served prediction
+        candidate_ms (float): Model latency of the shadow prediction
+        date_created (DateTime): When the request was served
+    """
+    __tablename__ = 'product_shadow_results'
+
+    id = db.Column(db.Integer, primary_key=True)
+    candidate_version = db.Column(db.String(64), nullable=False, index=True)
+    primary_version = db.Column(db.String(64), nullable=True)
+    product_category = db.Column(db.String(50), nullable=True)
+    primary_score = db.Column(db.Float, nullable=True)
+    candidate_score = db.Column(db.Float, nullable=True)
+    primary_ms = db.Column(db.Float, nullable=True)
+    candidate_ms = db.Column(db.Float, nullable=True)
+    date_created = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @staticmethod
+    def bulk_insert(rows):
+        """Insert result dicts with one executemany; the caller commits"""
+        db.session.execute(db.insert(productShadowResult), rows)
+        return len(rows)
+
+    @staticmethod
+    def summary(candidate_version, limit=10000):
+        """Score deltas and latencies of the newest limit results for a candidate"""
+        query = db.select(productShadowResult).where(
+            productShadowResult.candidate_version == candidate_version
+        ).order_by(productShadowResult.id.desc()).limit(limit)
+        df = pd.read_sql(query, db.session.connection())
+        if df.empty:
+            return {'count': 0}
+
+        delta = df['candidate_score'] - df['primary_score']
+        agree = (df['candidate_score'] >= SUCCESS_THRESHOLD) == (df['primary_score'] >= SUCCESS_THRESHOLD)
+
+        def latency(col):
+            return {
+                'mean': round(float(df[col].mean()), 4),
+                'p50': round(float(df[col].quantile(0.5)), 4),
+                'p95': round(float(df[col].quantile(0.95)), 4)
+            }
+
+        by_category = df.assign(delta=delta, abs_delta=delta.abs()).groupby('product_category')
+        return {
+            'count': len(df),
+            'primary_versions': sorted(df['primary_version'].dropna().unique().tolist()),
+            'mean_delta': round(float(delta.mean()), 4),
+            'mean_abs_delta': round(float(delta.abs().mean()), 4),
+            'max_abs_delta': round(float(delta.abs().max()), 4),
+            'decision_agreement': round(float(agree.mean()), 4),
+            'primary_ms': latency('primary_ms'),
+            'candidate_ms': latency('candidate_ms'),
+            'categories': {
+                category: {
+                    'count': int(len(group)),
+                    'mean_delta': round(float(group['delta'].mean()), 4),
+                    'mean_abs_delta': round(float(group['abs_delta'].mean()), 4)
+                } for category, group in by_category
+            },
+            'first': df['date_created'].min().isoformat(),
+            'last': df['date_created'].max().isoformat()
+        }
+
 def initproductSalesPredictions():
     """Initialize the database table - drops existing table and creates new one"""
     with app.app_context():
@@ -111,6 +713,8 @@ def initproductSalesPredictions():
                 product_category="Sample"
             )
             db.session.add(test_record)
+            productCategoryStats.record([test_record.read()])
+            productPredictionRollup.record([test_record.read()])
             db.session.commit()
             app.logger.info("Added test record to product_sales_predictions table")
             
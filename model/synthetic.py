@@ -0,0 +1,238 @@
+"""Reproducible synthetic data at production scale, for benchmarks and capacity planning.
+
+Every table draws from its own random stream derived from the seed, so the
+same seed and counts always give the same rows, and changing one count does
+not change the other tables. Rows are built a batch at a time with numpy and
+written with one executemany per batch, committed batch by batch so memory
+stays flat from thousands to millions of rows.
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from werkzeug.security import generate_password_hash
+
+from __init__ import app, db
+from model.user import User
+from model.deck import Deck
+from model.flashcard import Flashcard
+from model.calendar import Event, Shipment
+from model.chatlog import ChatLog
+from model.studylog import productSalesPrediction, SUCCESS_THRESHOLD
+
+SYNTHETIC_BATCH_SIZE = 10000
+# Per-table stream ids; append new tables rather than reordering
+TABLE_STREAMS = ['users', 'decks', 'flashcards', 'events', 'shipments', 'predictions', 'chat_logs']
+
+FIRST_NAMES = ['Ada', 'Alan', 'Grace', 'Linus', 'Margaret', 'Dennis', 'Barbara', 'Ken', 'Frances', 'Edsger',
+               'Radia', 'Tim', 'Katherine', 'John', 'Hedy', 'Guido']
+LAST_NAMES = ['Lovelace', 'Turing', 'Hopper', 'Torvalds', 'Hamilton', 'Ritchie', 'Liskov', 'Thompson', 'Allen',
+              'Dijkstra', 'Perlman', 'Berners-Lee', 'Johnson', 'McCarthy', 'Lamarr', 'van Rossum']
+PFPS = ['toby.png', 'hop.png', 'niko.png', 'xat.png']
+# Decks are inventory groups; cards are items whose content is "<quantity> / <description>"
+DECK_TITLES = ['Pantry', 'Electronics', 'Clothing', 'Sports Gear', 'Home Goods', 'Toys', 'Books', 'Produce',
+               'Office Supplies', 'Warehouse A', 'Warehouse B', 'Seasonal']
+ITEMS = ['apple', 'banana', 'laptop', 'headphones', 'shirt', 'jacket', 'ball', 'racket', 'lamp', 'kitchen utensil',
+         'lego set', 'puzzle', 'novel', 'textbook', 'tomato', 'carrot', 'tablet', 'sneakers', 'board game', 'comic']
+ITEM_ADJECTIVES = ['Red', 'Large', 'Compact', 'Organic', 'Deluxe', 'Classic', 'Wireless', 'Kids', 'Travel', 'Eco']
+ITEM_DESCRIPTIONS = ['restock weekly', 'fragile, store upright', 'best seller', 'clearance', 'new arrival',
+                     'backordered from supplier', 'seasonal item', 'keep refrigerated', 'bulk pack', 'display model']
+EVENT_CATEGORIES = ['meeting', 'delivery', 'inventory count', 'promotion', 'maintenance', 'training']
+TRANSPORT_METHODS = ['truck', 'rail', 'air', 'ship', 'courier']
+DESTINATIONS = ['San Diego', 'Los Angeles', 'Phoenix', 'Seattle', 'Denver', 'Austin', 'Chicago', 'New York']
+# Product types with their taxonomy category (see api/product_taxonomy.json)
+PRODUCT_TYPES = {
+    'apple': 'fruits', 'banana': 'fruits', 'grape': 'fruits', 'tomato': 'vegetables', 'carrot': 'vegetables',
+    'laptop': 'electronics', 'phone': 'electronics', 'headphones': 'electronics', 'shirt': 'clothing',
+    'jacket': 'clothing', 'sneakers': 'clothing', 'ball': 'sports', 'racket': 'sports', 'lamp': 'home_goods',
+    'kitchen utensil': 'home_goods', 'lego set': 'toys', 'board game': 'toys', 'novel': 'books',
+    'textbook': 'books', 'chocolate bar': 'miscellaneous'
+}
+SEASONALITY = ['spring', 'summer', 'fall', 'winter', 'holiday', 'all year']
+QUESTIONS = ['How many {item} do we have?', 'When does the next {item} shipment arrive?',
+             'Which deck is {item} in?', 'Add a new item called {item}', 'What sells best in {deck}?']
+RESPONSES = ['You have {n} {item} in stock.', 'The next {item} shipment arrives in {n} days.',
+             '{item} is in the {deck} deck.', 'Added {item} with quantity {n}.', '{item} leads {deck} with {n} sales.']
+
+
+def _stream(seed, table):
+    return np.random.default_rng([seed, TABLE_STREAMS.index(table)])
+
+
+def _batches(total, batch_size):
+    for start in range(0, total, batch_size):
+        yield start, min(batch_size, total - start)
+
+
+def _pick(rng, values, size):
+    return np.asarray(values, dtype=object)[rng.integers(0, len(values), size)]
+
+
+def _insert(model, frame):
+    db.session.execute(db.insert(model), frame.to_dict('records'))
+    db.session.commit()
+
+
+def _new_ids(model, after_id):
+    """Ids inserted since after_id, in insert order"""
+    query = db.select(model.id).where(model.id > after_id).order_by(model.id)
+    return np.fromiter(db.session.scalars(query), dtype=np.int64)
+
+
+def _max_id(model):
+    return db.session.scalar(db.select(db.func.max(model.id))) or 0
+
+
+def _users(rng, count, batch_size, seed, password):
+    before = _max_id(User)
+    uids = []
+    for start, size in _batches(count, batch_size):
+        numbers = np.arange(start, start + size)
+        first, last = _pick(rng, FIRST_NAMES, size), _pick(rng, LAST_NAMES, size)
+        batch_uids = [f'synth{seed}_{n}' for n in numbers]
+        _insert(User, pd.DataFrame({
+            '_name': first + ' ' + last,
+            '_uid': batch_uids,
+            '_email': [f'{uid}@example.com' for uid in batch_uids],
+            '_password': password,
+            '_role': np.where(rng.random(size) < 0.02, 'Admin', 'User'),
+            '_pfp': _pick(rng, PFPS, size)
+        }))
+        uids.extend(batch_uids)
+    return _new_ids(User, before), np.asarray(uids, dtype=object)
+
+
+def _decks(rng, count, batch_size, user_ids):
+    before = _max_id(Deck)
+    owners = []
+    for _, size in _batches(count, batch_size):
+        batch_owners = user_ids[rng.integers(0, len(user_ids), size)]
+        _insert(Deck, pd.DataFrame({'_title': _pick(rng, DECK_TITLES, size), '_user_id': batch_owners}))
+        owners.append(batch_owners)
+    return _new_ids(Deck, before), np.concatenate(owners) if owners else np.array([], dtype=np.int64)
+
+
+def _flashcards(rng, count, batch_size, deck_ids, deck_owners):
+    for _, size in _batches(count, batch_size):
+        decks = rng.integers(0, len(deck_ids), size)
+        quantities = rng.negative_binomial(2, 0.05, size)
+        _insert(Flashcard, pd.DataFrame({
+            '_title': _pick(rng, ITEM_ADJECTIVES, size) + ' ' + _pick(rng, ITEMS, size),
+            '_content': [f'{q} / {d}' for q, d in zip(quantities, _pick(rng, ITEM_DESCRIPTIONS, size))],
+            '_user_id': deck_owners[decks],
+            '_deck_id': deck_ids[decks]
+        }))
+
+
+def _events(rng, count, batch_size, uids, now, days):
+    for _, size in _batches(count, batch_size):
+        start = now + pd.to_timedelta(rng.integers(-days * 24 * 60, days * 24 * 60, size), unit='min')
+        category = _pick(rng, EVENT_CATEGORIES, size)
+        _insert(Event, pd.DataFrame({
+            'uid': _pick(rng, uids, size),
+            'title': np.char.title(category.astype(str)).astype(object) + ' #' + rng.integers(1, 1000, size).astype(str),
+            'description': _pick(rng, ITEM_DESCRIPTIONS, size),
+            'start_time': start.to_pydatetime(),
+            'end_time': (start + pd.to_timedelta(rng.choice([30, 60, 90, 120, 240], size), unit='min')).to_pydatetime(),
+            'category': category
+        }))
+
+
+def _shipments(rng, count, batch_size, uids, now, days):
+    for _, size in _batches(count, batch_size):
+        when = now + pd.to_timedelta(rng.integers(-days * 24 * 60, days * 24 * 60, size), unit='min')
+        _insert(Shipment, pd.DataFrame({
+            'uid': _pick(rng, uids, size),
+            'inventory': _pick(rng, ITEMS, size),
+            'amount': rng.integers(1, 500, size),
+            'transport_method': _pick(rng, TRANSPORT_METHODS, size),
+            'shipment_time': when.strftime('%Y-%m-%dT%H:%M:%S'),
+            'destination': _pick(rng, DESTINATIONS, size)
+        }))
+
+
+def _predictions(rng, count, batch_size, now, days):
+    types = list(PRODUCT_TYPES)
+    season_effect = {'spring': 2, 'summer': 4, 'fall': 0, 'winter': -3, 'holiday': 6, 'all year': 1}
+    span = days * 24 * 3600
+    for start, size in _batches(count, batch_size):
+        # Rows arrive in time order, as in production, so each batch folds into few rollup buckets
+        seconds = np.sort(rng.integers(span * start // count, span * (start + size) // count + 1, size))
+        product_type = _pick(rng, types, size)
+        seasonality = _pick(rng, SEASONALITY, size)
+        price = np.round(rng.lognormal(3.3, 0.9, size), 2)
+        marketing = rng.integers(1, 11, size)
+        distribution = np.round(rng.uniform(1, 10, size), 1)
+        score = (35 + 3.2 * marketing + 2.6 * distribution - 6 * np.log1p(price)
+                 + pd.Series(seasonality).map(season_effect).to_numpy() + rng.normal(0, 6, size))
+        score = np.round(np.clip(score, 0, 100), 2)
+        df = pd.DataFrame({
+            'product_type': product_type,
+            'seasonality': seasonality,
+            'price': price,
+            'marketing': marketing,
+            'distribution_channels': distribution,
+            'predicted_success': score >= SUCCESS_THRESHOLD,
+            'success_score': score,
+            'product_category': pd.Series(product_type).map(PRODUCT_TYPES).to_numpy(),
+            'source': 'prediction',
+            'date_created': (now - pd.Timedelta(seconds=span) + pd.to_timedelta(seconds, unit='s')).to_pydatetime()
+        })
+        # Goes through bulk_insert so the category stats and rollups stay in step
+        productSalesPrediction.bulk_insert(df)
+        db.session.commit()
+
+
+def _chat_logs(rng, count, batch_size):
+    for _, size in _batches(count, batch_size):
+        template = rng.integers(0, len(QUESTIONS), size)
+        items, decks = _pick(rng, ITEMS, size), _pick(rng, DECK_TITLES, size)
+        numbers = rng.integers(1, 200, size)
+        _insert(ChatLog, pd.DataFrame({
+            '_question': [QUESTIONS[t].format(item=i, deck=d) for t, i, d in zip(template, items, decks)],
+            '_response': [RESPONSES[t].format(item=i, deck=d, n=n) for t, i, d, n in zip(template, items, decks, numbers)]
+        }))
+
+
+def generate_synthetic_data(users=1000, decks=2000, flashcards=20000, events=5000, shipments=5000,
+                            predictions=50000, chat_logs=5000, seed=42, days=365,
+                            batch_size=SYNTHETIC_BATCH_SIZE, progress=print):
+    """Insert synthetic rows into each table; returns the rows written per table.
+
+    Users are named synth<seed>_<n> and share the default password (hashed
+    once), so a seed can only be generated once per database. Timestamps
+    fall within days of today (UTC midnight), predictions in the past only.
+    Decks, flashcards, events and shipments need at least one user.
+    """
+    with app.app_context():
+        db.create_all()
+        if db.session.scalar(db.select(User.id).where(User._uid == f'synth{seed}_0')):
+            raise ValueError(f'Synthetic data for seed {seed} already exists')
+        if not users and (decks or flashcards or events or shipments):
+            raise ValueError('Decks, flashcards, events and shipments need at least one user')
+        if flashcards and not decks:
+            raise ValueError('Flashcards need at least one deck')
+
+        now = pd.Timestamp(datetime.utcnow().date())
+        password = generate_password_hash(app.config['DEFAULT_PASSWORD'], "pbkdf2:sha256", salt_length=10)
+        written = {}
+
+        def done(table, count):
+            written[table] = count
+            progress(f"{table}: {count} rows")
+
+        user_ids, uids = _users(_stream(seed, 'users'), users, batch_size, seed, password)
+        done('users', users)
+        deck_ids, deck_owners = _decks(_stream(seed, 'decks'), decks, batch_size, user_ids)
+        done('decks', decks)
+        _flashcards(_stream(seed, 'flashcards'), flashcards, batch_size, deck_ids, deck_owners)
+        done('flashcards', flashcards)
+        _events(_stream(seed, 'events'), events, batch_size, uids, now, days)
+        done('events', events)
+        _shipments(_stream(seed, 'shipments'), shipments, batch_size, uids, now, days)
+        done('shipments', shipments)
+        _predictions(_stream(seed, 'predictions'), predictions, batch_size, now, days)
+        done('predictions', predictions)
+        _chat_logs(_stream(seed, 'chat_logs'), chat_logs, batch_size)
+        done('chat_logs', chat_logs)
+        return written